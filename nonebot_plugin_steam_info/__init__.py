@@ -1,5 +1,9 @@
+import json
 import time
 import httpx
+import asyncio
+import functools
+import hashlib
 import nonebot
 from io import BytesIO
 from pathlib import Path
@@ -7,8 +11,9 @@ from nonebot.log import logger
 from PIL import Image as PILImage
 from nonebot.params import Depends
 from nonebot.params import CommandArg
+from nonebot.permission import SUPERUSER
 from nonebot import on_command, require
-from typing import Union, Optional, List, Dict
+from typing import Union, Optional, List, Dict, Set
 from nonebot.adapters import Message, Event, Bot
 from nonebot.plugin import PluginMetadata, inherit_supported_adapters
 
@@ -21,26 +26,71 @@ from nonebot_plugin_apscheduler import scheduler
 from nonebot_plugin_alconna import Text, Image, UniMessage, Target, At, MsgTarget
 
 from .config import Config
-from .models import ProcessedPlayer
-from .data_source import BindData, SteamInfoData, ParentData, DisableParentData
+from .assets import load_assets
+from .models import Player, ProcessedPlayer
+from .storage import SqliteStore
+from .cache import (
+    DiskCache,
+    LRUCache,
+    SingleFlight,
+    StaleWhileRevalidateCache,
+    remove_legacy_cache_files,
+)
+from .render import RenderFarm, RenderBusyError
+from .executor import (
+    run_io,
+    run_render,
+    init_executors,
+    shutdown_executors,
+    get_executor_stats,
+)
+from .ratelimit import ApiKeyPool
+from .broadcast import BroadcastScheduler
+from .client import (
+    get_client,
+    init_client,
+    close_client,
+    configure_client,
+    get_pool_stats,
+    get_request_counts,
+)
+from .data_source import (
+    BindData,
+    ParentData,
+    SteamInfoData,
+    ApiKeyUsageData,
+    DisableParentData,
+)
 from .steam import (
     get_steam_id,
-    get_user_data,
+    fetch_user_data,
     STEAM_ID_OFFSET,
     get_steam_users_info,
+    get_default_user_data,
 )
 from .draw import (
     check_font,
+    MEMBER_AVATAR_SIZE,
+    GAMING_AVATAR_SIZE,
+    PROFILE_AVATAR_SIZE,
+    encode_image,
+    draw_to_bytes,
     set_font_paths,
+    draw_player_card,
+    friend_tile_cache,
     draw_start_gaming,
-    draw_player_status,
+    set_image_encoder,
     draw_friends_status,
+    set_friend_tile_cache_size,
+    set_background_reduce_factor,
     vertically_concatenate_images,
 )
 from .utils import (
-    fetch_avatar,
-    image_to_bytes,
-    simplize_steam_player_data,
+    get_avatars,
+    avatar_cache,
+    get_profile_avatar,
+    get_player_status,
+    simplize_steam_players,
     convert_player_name_to_nickname,
 )
 
@@ -58,6 +108,8 @@ steamenable: 启用 Steam 播报
 steamdisable: 禁用 Steam 播报
 steamupdate [名称] [图片]: 更新群信息
 steamnickname [昵称]: 设置玩家昵称
+steamstats: 查看插件运行状态 (仅超级用户)
+steamcache: 查看图片缓存状态 (仅超级用户)
 """.strip(),
     type="application",
     homepage="https://github.com/zhaomaoniu/nonebot-plugin-steam-info",
@@ -75,6 +127,12 @@ enable = on_command("steamenable", aliases={"启用steam"}, priority=10)
 disable = on_command("steamdisable", aliases={"禁用steam"}, priority=10)
 update_parent_info = on_command("steamupdate", aliases={"更新群信息"}, priority=10)
 set_nickname = on_command("steamnickname", aliases={"steam昵称"}, priority=10)
+stats = on_command(
+    "steamstats", aliases={"steam状态"}, permission=SUPERUSER, priority=10
+)
+cache_stats = on_command(
+    "steamcache", aliases={"steam缓存"}, permission=SUPERUSER, priority=10
+)
 
 
 if hasattr(nonebot, "get_plugin_config"):
@@ -89,6 +147,46 @@ set_font_paths(
     config.steam_font_light_path,
     config.steam_font_bold_path,
 )
+set_background_reduce_factor(config.steam_background_reduce_factor)
+configure_client(
+    config.proxy,
+    config.steam_http2,
+    config.steam_http_max_connections,
+    config.steam_http_max_keepalive_connections,
+    config.steam_http_keepalive_expiry,
+)
+set_friend_tile_cache_size(config.steam_friend_tile_cache_bytes)
+avatar_cache.resize(config.steam_avatar_cache_bytes)
+for card_type, image_format in (
+    ("profile", config.steam_profile_image_format),
+    ("friends", config.steam_friends_image_format),
+    ("start_gaming", config.steam_start_gaming_image_format),
+):
+    set_image_encoder(
+        card_type,
+        image_format,
+        config.steam_image_quality,
+        config.steam_png_compress_level,
+    )
+
+# 在创建进程池前加载，子进程在进程池创建时立即 fork，可直接复用资源与以上设置
+load_assets()
+
+# 进程池在创建时 fork，需要在 IO 线程池、SQLite 与事件循环的线程启动前创建。
+# 两个进程池都启用时，后创建的进程池 fork 时只有前一个进程池空闲的后台线程
+init_executors(
+    config.steam_render_executor,
+    config.steam_render_workers,
+    config.steam_io_workers,
+)
+
+render_farm = (
+    RenderFarm.create(
+        config.steam_render_farm_workers, config.steam_render_farm_max_queue
+    )
+    if config.steam_render_farm_workers > 0
+    else None
+)
 
 bind_data_path = store.get_data_file("nonebot_plugin_steam_info", "bind_data.json")
 steam_info_data_path = store.get_data_file(
@@ -98,13 +196,62 @@ parent_data_path = store.get_data_file("nonebot_plugin_steam_info", "parent_data
 disable_parent_data_path = store.get_data_file(
     "nonebot_plugin_steam_info", "disable_parent_data.json"
 )
-avatar_path = store.get_cache_dir("nonebot_plugin_steam_info")
-cache_path = avatar_path
+cache_path = store.get_cache_dir("nonebot_plugin_steam_info")
+
+removed = remove_legacy_cache_files(cache_path)
+if removed > 0:
+    logger.info(f"已删除 {removed} 个旧版本的缓存文件")
 
-bind_data = BindData(bind_data_path)
-steam_info_data = SteamInfoData(steam_info_data_path)
-parent_data = ParentData(parent_data_path)
-disable_parent_data = DisableParentData(disable_parent_data_path)
+# 头像、游戏封面、成就图标与个人主页数据共用的磁盘缓存
+disk_cache = DiskCache(cache_path / "assets", config.steam_cache_max_bytes)
+
+if config.steam_storage == "sqlite":
+    sqlite_store = SqliteStore(
+        store.get_data_file("nonebot_plugin_steam_info", "steam_info.db")
+    )
+elif config.steam_storage == "json":
+    sqlite_store = None
+else:
+    logger.error(f"未知的存储类型: {config.steam_storage}，将使用 json")
+    sqlite_store = None
+
+bind_data = BindData(bind_data_path, sqlite_store)
+steam_info_data = SteamInfoData(steam_info_data_path, sqlite_store)
+parent_data = ParentData(parent_data_path, sqlite_store)
+disable_parent_data = DisableParentData(disable_parent_data_path, sqlite_store)
+api_key_usage_data = ApiKeyUsageData(
+    store.get_data_file("nonebot_plugin_steam_info", "api_key_usage.json"),
+    sqlite_store,
+)
+
+api_key_pool = ApiKeyPool(
+    config.steam_api_key,
+    config.steam_api_daily_limit,
+    config.steam_api_rate_limit,
+    config.steam_api_burst,
+    usage=api_key_usage_data,
+)
+
+# steamcheck 的渲染结果缓存
+check_cache = LRUCache(16 * 1024 * 1024, len, config.steam_check_cache_ttl)
+check_flight = SingleFlight()
+refresh_flight = SingleFlight()
+broadcast_tasks: Set[asyncio.Future] = set()  # 后台进行中的播报
+
+broadcast_scheduler = BroadcastScheduler(
+    config.steam_broadcast_concurrency,
+    config.steam_broadcast_send_rate,
+    config.steam_broadcast_send_burst,
+    config.steam_broadcast_timeout,
+)
+
+# steaminfo 的个人主页数据缓存
+profile_cache = StaleWhileRevalidateCache(
+    disk_cache,
+    "profile_",
+    config.steam_profile_cache_ttl,
+    config.steam_profile_cache_stale_ttl,
+)
 
 try:
     check_font()
@@ -114,6 +261,25 @@ except FileNotFoundError as e:
     )
 
 
+@nonebot.get_driver().on_startup
+async def start_http_client():
+    await init_client()
+
+
+@nonebot.get_driver().on_shutdown
+async def stop_http_client():
+    await close_client()
+
+
+if sqlite_store is not None:
+    nonebot.get_driver().on_shutdown(sqlite_store.close)
+
+nonebot.get_driver().on_shutdown(shutdown_executors)
+
+if render_farm is not None:
+    nonebot.get_driver().on_shutdown(render_farm.shutdown)
+
+
 async def get_target(target: MsgTarget) -> Optional[Target]:
     if target.private:
         # 不支持私聊消息
@@ -130,11 +296,10 @@ async def to_image_data(image: Image) -> Union[BytesIO, bytes]:
         return Path(image.path).read_bytes()
 
     if image.url is not None:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(image.url)
-            if response.status_code != 200:
-                raise ValueError(f"无法获取图片数据: {response.status_code}")
-            return response.content
+        response = await get_client().get(image.url)
+        if response.status_code != 200:
+            raise ValueError(f"无法获取图片数据: {response.status_code}")
+        return response.content
 
     raise ValueError("无法获取图片数据")
 
@@ -149,7 +314,8 @@ async def broadcast_steam_info(
 
     bot = nonebot.get_bot()
 
-    play_data = steam_info_data.compare(old_players, new_players)
+    with broadcast_scheduler.stage("compare"):
+        play_data = steam_info_data.compare(old_players, new_players)
 
     msg = []
     for entry in play_data:
@@ -184,82 +350,165 @@ async def broadcast_steam_info(
         return None
 
     if config.steam_broadcast_type == "all":
-        steam_status_data = [
-            convert_player_name_to_nickname(
-                (await simplize_steam_player_data(player, config.proxy, avatar_path)),
-                parent_id,
-                bind_data,
+        with broadcast_scheduler.stage("avatar"):
+            steam_status_data = [
+                convert_player_name_to_nickname(data, parent_id, bind_data)
+                for data in await simplize_steam_players(
+                    new_players,
+                    disk_cache,
+                    MEMBER_AVATAR_SIZE,
+                    config.steam_avatar_concurrency,
+                )
+            ]
+
+        parent_avatar, parent_name = await run_io(parent_data.get, parent_id)
+        with broadcast_scheduler.stage("render"):
+            image = await run_render(
+                draw_to_bytes,
+                draw_friends_status,
+                parent_avatar,
+                parent_name,
+                steam_status_data,
+                card_type="friends",
             )
-            for player in new_players
-        ]
-
-        parent_avatar, parent_name = parent_data.get(parent_id)
-        image = draw_friends_status(parent_avatar, parent_name, steam_status_data)
-        uni_msg = UniMessage([Text("\n".join(msg)), Image(raw=image_to_bytes(image))])
+        uni_msg = UniMessage([Text("\n".join(msg)), Image(raw=image)])
     elif config.steam_broadcast_type == "part":
-        images = [
-            draw_start_gaming(
-                (await fetch_avatar(entry["player"], avatar_path, config.proxy)),
-                entry["player"]["personaname"],
-                entry["player"]["gameextrainfo"],
-                bind_data.get_by_steam_id(parent_id, entry["player"]["steamid"])[
-                    "nickname"
-                ],
+        start_players = [
+            entry["player"] for entry in play_data if entry["type"] == "start"
+        ]
+        with broadcast_scheduler.stage("avatar"):
+            avatars = await get_avatars(
+                start_players,
+                GAMING_AVATAR_SIZE,
+                disk_cache,
+                config.steam_avatar_concurrency,
+            )
+        # 同一玩家的卡片在本轮播报的各群间共享，只渲染、编码一次
+        card_keys = [
+            (
+                player["steamid"],
+                player["avatarhash"],
+                player["personaname"],
+                player["gameextrainfo"],
+                bind_data.get_by_steam_id(parent_id, player["steamid"])["nickname"],
             )
-            for entry in play_data
-            if entry["type"] == "start"
+            for player in start_players
         ]
+        with broadcast_scheduler.stage("render"):
+            images = [
+                await broadcast_scheduler.once(
+                    ("start_gaming", *key),
+                    functools.partial(run_render, draw_start_gaming, avatar, *key[2:]),
+                )
+                for key, avatar in zip(card_keys, avatars)
+            ]
         if images == []:
             uni_msg = UniMessage([Text("\n".join(msg))])
         else:
-            image = (
-                vertically_concatenate_images(images) if len(images) > 1 else images[0]
-            )
-            uni_msg = UniMessage(
-                [Text("\n".join(msg)), Image(raw=image_to_bytes(image))]
-            )
+            with broadcast_scheduler.stage("encode"):
+                if len(images) > 1:
+                    image = await run_render(
+                        draw_to_bytes,
+                        vertically_concatenate_images,
+                        images,
+                        card_type="start_gaming",
+                    )
+                else:
+                    image = await broadcast_scheduler.once(
+                        ("start_gaming_bytes", *card_keys[0]),
+                        functools.partial(
+                            run_render, encode_image, images[0], "start_gaming"
+                        ),
+                    )
+            uni_msg = UniMessage([Text("\n".join(msg)), Image(raw=image)])
     elif config.steam_broadcast_type == "none":
         uni_msg = UniMessage([Text("\n".join(msg))])
     else:
         logger.error(f"未知的播报类型: {config.steam_broadcast_type}")
         return None
 
-    await uni_msg.send(
-        Target(parent_id, parent_id, True, False, "", bot.adapter.get_name()), bot
+    adapter = bot.adapter.get_name()
+    await broadcast_scheduler.send(
+        adapter,
+        lambda: uni_msg.send(
+            Target(parent_id, parent_id, True, False, "", adapter), bot
+        ),
     )
 
 
-async def update_steam_info():
+async def update_steam_info() -> Optional[Dict[str, ProcessedPlayer]]:
+    """更新玩家状态，返回状态发生变化的玩家的旧数据，获取失败时返回 None"""
     steam_ids = bind_data.get_all_steam_id()
 
     steam_info = await get_steam_users_info(
-        steam_ids, config.steam_api_key, config.proxy
+        steam_ids, api_key_pool, config.steam_request_concurrency
     )
 
-    old_players_dict: Dict[str, List[ProcessedPlayer]] = {}
-
-    for parent_id in bind_data.content.keys():
-        steam_ids = bind_data.get_all(parent_id)
-        old_players_dict[parent_id] = steam_info_data.get_players(steam_ids)
+    if steam_info["response"]["players"] == []:
+        return None
 
-    if steam_info["response"]["players"] != []:
-        steam_info_data.update_by_players(steam_info["response"]["players"])
-        steam_info_data.save()
+    players = steam_info["response"]["players"]
+    old_players = steam_info_data.update_by_players(players)
+    steam_info_data.retain(steam_ids)
+    # 只标记实际获取到的玩家，获取失败的批次保留旧数据但不视为已更新
+    steam_info_data.mark_updated(player["steamid"] for player in players)
+    steam_info_data.save()
 
-    return bind_data, old_players_dict
+    return old_players
 
 
 @scheduler.scheduled_job(
     "interval", minutes=config.steam_request_interval / 60, id="update_steam_info"
 )
 async def fetch_and_broadcast_steam_info():
-    bind_data, old_players_dict = await update_steam_info()
+    """定时轮询并等待本次播报完成"""
+    await refresh_steam_info()
+    await asyncio.gather(*broadcast_tasks)
+
+
+async def refresh_steam_info() -> Optional[Dict[str, ProcessedPlayer]]:
+    """更新玩家状态并在后台播报，同时进行的轮询与 steamcheck 刷新会合并为一次请求
+
+    返回值与 update_steam_info 相同，调用方无需等待播报完成
+    """
+    return await refresh_flight.do("steam_info", poll_steam_info)
+
+
+async def poll_steam_info() -> Optional[Dict[str, ProcessedPlayer]]:
+    with broadcast_scheduler.stage("poll"):
+        old_players = await update_steam_info()
+
+    if old_players:
+        task = asyncio.ensure_future(broadcast_changed_players(old_players))
+        broadcast_tasks.add(task)
+        task.add_done_callback(broadcast_tasks.discard)
+
+    return old_players
 
-    for parent_id in bind_data.content.keys():
-        old_players = old_players_dict[parent_id]
-        new_players = steam_info_data.get_players(bind_data.get_all(parent_id))
 
-        await broadcast_steam_info(parent_id, old_players, new_players)
+async def broadcast_changed_players(old_players: Dict[str, ProcessedPlayer]):
+
+    # 只处理有玩家状态变化的群
+    parent_ids = dict.fromkeys(
+        parent_id
+        for steam_id in old_players
+        for parent_id in bind_data.get_parents(steam_id)
+    )
+
+    jobs = {}
+    for parent_id in parent_ids:
+        steam_ids = bind_data.get_all(parent_id)
+        changed_players = [
+            old_players[steam_id] for steam_id in steam_ids if steam_id in old_players
+        ]
+        new_players = steam_info_data.get_players(steam_ids)
+
+        jobs[parent_id] = functools.partial(
+            broadcast_steam_info, parent_id, changed_players, new_players
+        )
+
+    # 各群并发播报，单个群失败不影响其他群
+    await broadcast_scheduler.run(jobs)
 
 
 if not config.steam_disable_broadcast_on_startup:
@@ -288,8 +537,8 @@ async def bind_handle(
 
     steam_id = get_steam_id(arg)
 
-    if user_data := bind_data.get(parent_id, event.get_user_id()):
-        user_data["steam_id"] = steam_id
+    if bind_data.get(parent_id, event.get_user_id()):
+        bind_data.set_steam_id(parent_id, event.get_user_id(), steam_id)
         bind_data.save()
 
         await bind.finish(f"已更新你的 Steam ID 为 {steam_id}")
@@ -354,38 +603,93 @@ async def info_handle(
         steam_id = user_data["steam_id"]
         steam_friend_code = str(int(steam_id) - STEAM_ID_OFFSET)
 
-    player_data = await get_user_data(steam_id, cache_path, config.proxy)
-
-    draw_data = [
-        {
-            "game_header": game["game_image"],
-            "game_name": game["game_name"],
-            "game_time": f"{game['play_time']} 小时",
-            "last_play_time": game["last_played"],
-            "achievements": game["achievements"],
-            "completed_achievement_number": game.get("completed_achievement_number"),
-            "total_achievement_number": game.get("total_achievement_number"),
-        }
-        for game in player_data["game_data"]
-    ]
+    try:
+        player_data = await profile_cache.get(
+            str(steam_id),
+            lambda: fetch_user_data(
+                steam_id,
+                disk_cache,
+                config.steam_asset_concurrency,
+                config.steam_asset_timeout,
+                config.steam_cache_revalidate_interval,
+            ),
+        )
+    except httpx.HTTPError as exc:
+        logger.error(f"Failed to get user data: {exc}")
+        player_data = get_default_user_data()
 
-    image = draw_player_status(
-        player_data["background"],
-        player_data["avatar"],
-        player_data["player_name"],
-        str(steam_friend_code),
-        player_data["description"],
-        player_data["recent_2_week_play_time"],
-        draw_data,
+    player_data["avatar"] = await get_profile_avatar(
+        str(steam_id), player_data["avatar"], PROFILE_AVATAR_SIZE
     )
 
+    try:
+        if render_farm is not None:
+            image = await render_farm.render_player_card(
+                player_data, str(steam_friend_code)
+            )
+        else:
+            image = await run_render(
+                draw_to_bytes,
+                draw_player_card,
+                player_data,
+                str(steam_friend_code),
+                card_type="profile",
+            )
+    except RenderBusyError:
+        await info.finish("当前查询的人太多啦，请稍后再试")
+
     await info.finish(
         await UniMessage(
-            Image(raw=image_to_bytes(image)),
+            Image(raw=image),
         ).export(bot)
     )
 
 
+def get_check_cache_key(parent_id: str, players: List[Player]) -> str:
+    """根据群信息与群友状态计算 steamcheck 的缓存键"""
+    states = sorted(
+        (
+            player["steamid"],
+            player["avatarhash"],
+            player["personaname"],
+            bind_data.get_by_steam_id(parent_id, player["steamid"])["nickname"],
+            get_player_status(player),
+            player["personastate"],
+        )
+        for player in players
+    )
+    content = json.dumps(
+        [
+            parent_id,
+            parent_data.content.get(parent_id),
+            parent_data.versions.get(parent_id, 0),
+            states,
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+async def render_check_image(parent_id: str, players: List[Player]) -> bytes:
+    parent_avatar, parent_name = await run_io(parent_data.get, parent_id)
+
+    steam_status_data = [
+        convert_player_name_to_nickname(data, parent_id, bind_data)
+        for data in await simplize_steam_players(
+            players, disk_cache, MEMBER_AVATAR_SIZE, config.steam_avatar_concurrency
+        )
+    ]
+
+    return await run_render(
+        draw_to_bytes,
+        draw_friends_status,
+        parent_avatar,
+        parent_name,
+        steam_status_data,
+        card_type="friends",
+    )
+
+
 @check.handle()
 async def check_handle(
     target: Target = Depends(get_target), arg: Message = CommandArg()
@@ -397,28 +701,36 @@ async def check_handle(
 
     steam_ids = bind_data.get_all(parent_id)
 
-    steam_info = await get_steam_users_info(
-        steam_ids, config.steam_api_key, config.proxy
+    max_age = (
+        config.steam_check_max_age
+        if config.steam_check_max_age is not None
+        else config.steam_request_interval
     )
-    if steam_info["response"]["players"] == []:
+    if steam_info_data.get_age() > max_age or any(
+        steam_id not in steam_info_data.updated_ids for steam_id in steam_ids
+    ):
+        # 数据过期或有新绑定的玩家，刷新全部玩家状态，播报在后台进行
+        if await refresh_steam_info() is None:
+            await check.finish("连接 Steam API 失败，请重试")
+
+    players = steam_info_data.get_players(steam_ids)
+    if players == []:
         await check.finish("连接 Steam API 失败，请重试")
 
-    logger.debug(f"{parent_id} Players info: {steam_info}")
+    logger.debug(f"{parent_id} Players info: {players}")
 
-    parent_avatar, parent_name = parent_data.get(parent_id)
+    key = get_check_cache_key(parent_id, players)
 
-    steam_status_data = [
-        convert_player_name_to_nickname(
-            (await simplize_steam_player_data(player, config.proxy, avatar_path)),
-            parent_id,
-            bind_data,
+    image = check_cache.get(key)
+    if image is None:
+        image = await check_flight.do(
+            key, lambda: render_check_image(parent_id, players)
         )
-        for player in steam_info["response"]["players"]
-    ]
-
-    image = draw_friends_status(parent_avatar, parent_name, steam_status_data)
+        check_cache.put(key, image)
 
-    await target.send(UniMessage(Image(raw=image_to_bytes(image))))
+    age = int(steam_info_data.get_age())
+    age_str = f"{age // 60} 分钟前" if age >= 60 else f"{age} 秒前"
+    await target.send(UniMessage([Text(f"数据更新于 {age_str}"), Image(raw=image)]))
 
 
 @update_parent_info.handle()
@@ -439,7 +751,9 @@ async def update_parent_info_handle(
     if "avatar" not in info or "name" not in info:
         await update_parent_info.finish("文本中应包含图片和文字")
 
-    parent_data.update(target.parent_id or target.id, info["avatar"], info["name"])
+    await run_io(
+        parent_data.update, target.parent_id or target.id, info["avatar"], info["name"]
+    )
     await update_parent_info.finish("更新成功")
 
 
@@ -485,3 +799,94 @@ async def set_nickname_handle(
     bind_data.save()
 
     await set_nickname.finish(f"已设置你的昵称为 {nickname}，将在 Steam 播报中显示")
+
+
+@stats.handle()
+async def stats_handle():
+    lines = ["HTTP 连接池:"]
+    for name, pool in get_pool_stats().items():
+        lines.append(
+            f"  {name}: {pool['connections']} 个连接, {pool['idle']} 个空闲, {pool['http2']} 个 HTTP/2"
+        )
+    lines.append("请求数:")
+    for host, count in get_request_counts().items():
+        lines.append(f"  {host}: {count}")
+
+    # 每次轮询需要 ceil(n / 100) 次调用
+    calls_per_poll = (len(bind_data.get_all_steam_id()) + 99) // 100
+    calls_per_day = calls_per_poll * 86400 // config.steam_request_interval
+    lines.append("执行器:")
+    for name, executor in get_executor_stats().items():
+        lines.append(
+            f"  {name}: {executor['workers']} 个工作线程, 执行中 {executor['in_flight']}, "
+            f"排队 {executor['queued']}, 峰值 {executor['max_in_flight']}, 已完成 {executor['completed']}"
+        )
+
+    if render_farm is not None:
+        farm = render_farm.stats()
+        lines.append(
+            f"  render_farm: {farm['workers']} 个进程, 执行中 {farm['in_flight']}, "
+            f"排队 {farm['queued']}, 已完成 {farm['completed']}, 已拒绝 {farm['rejected']}"
+        )
+
+    tile_cache = friend_tile_cache.stats()
+    lines.append(
+        f"好友状态行缓存: {tile_cache['items']} 张, "
+        f"{tile_cache['bytes'] / 1024 / 1024:.1f}/{tile_cache['max_bytes'] / 1024 / 1024:.1f} MiB, "
+        f"命中率 {tile_cache['hit_rate']:.1%} ({tile_cache['hits']}/{tile_cache['hits'] + tile_cache['misses']})"
+    )
+
+    check_cache_stats = check_cache.stats()
+    lines.append(
+        f"steamcheck 缓存: {check_cache_stats['items']} 张, "
+        f"命中率 {check_cache_stats['hit_rate']:.1%}, 合并请求 {check_flight.coalesced} 次, "
+        f"合并刷新 {refresh_flight.coalesced} 次, 数据更新于 {steam_info_data.get_age():.0f} 秒前"
+    )
+
+    profile_cache_stats = profile_cache.stats()
+    lines.append(
+        f"个人主页缓存: 命中 {profile_cache_stats['hits']}, 过期命中 {profile_cache_stats['stale_hits']}, "
+        f"未命中 {profile_cache_stats['misses']}, 合并请求 {profile_cache_stats['coalesced']}"
+    )
+
+    broadcast = broadcast_scheduler.stats()
+    lines.append(
+        f"播报: 成功 {broadcast['completed']} 个群, 失败 {broadcast['failures']}, "
+        f"超时 {broadcast['timeouts']}, 各群共享渲染 {broadcast['shared_hits']}/"
+        f"{broadcast['shared_hits'] + broadcast['shared_misses']} 次"
+    )
+    for name, timing in broadcast["stages"].items():
+        lines.append(
+            f"  {name}: {timing['count']} 次, 平均 {timing['avg'] * 1000:.0f} ms, "
+            f"最大 {timing['max'] * 1000:.0f} ms, 最近 {timing['last'] * 1000:.0f} ms"
+        )
+
+    lines.append(f"API Key (轮询预计每日调用 {calls_per_day} 次):")
+    for key_stats in api_key_pool.stats():
+        line = (
+            f"  {key_stats['key']}: 今日 {key_stats['calls_today']}/{key_stats['daily_limit']}, "
+            f"累计 {key_stats['total_calls']}, 失败 {key_stats['failures']}, 429 {key_stats['rate_limited']}"
+        )
+        if key_stats["backoff"] > 0:
+            line += f", 退避中 {key_stats['backoff']:.0f} 秒"
+        lines.append(line)
+
+    await stats.finish("\n".join(lines))
+
+
+@cache_stats.handle()
+async def cache_stats_handle():
+    disk = disk_cache.stats()
+    profile = profile_cache.stats()
+    avatar = avatar_cache.stats()
+    await cache_stats.finish(
+        f"图片缓存: {disk['items']} 个文件, "
+        f"{disk['bytes'] / 1024 / 1024:.1f}/{disk['max_bytes'] / 1024 / 1024:.1f} MiB\n"
+        f"命中率 {disk['hit_rate']:.1%} ({disk['hits']}/{disk['hits'] + disk['misses']}), "
+        f"已淘汰 {disk['evictions']} 个文件\n"
+        f"头像缓存: {avatar['items']} 张, "
+        f"{avatar['bytes'] / 1024 / 1024:.1f}/{avatar['max_bytes'] / 1024 / 1024:.1f} MiB, "
+        f"命中率 {avatar['hit_rate']:.1%}\n"
+        f"个人主页缓存: 命中 {profile['hits']}, 过期命中 {profile['stale_hits']}, "
+        f"未命中 {profile['misses']}"
+    )
@@ -0,0 +1,66 @@
+import time
+from PIL import Image
+from pathlib import Path
+from nonebot.log import logger
+from typing import Dict, Optional, Tuple
+
+
+RES_DIR = Path(__file__).parent / "res"
+
+# 绘图用到的图片: 预缩放尺寸
+IMAGE_ASSETS: Dict[str, Optional[Tuple[int, int]]] = {
+    "busy.png": None,
+    "friends_search.png": None,
+    "gaming.png": None,
+    "parent_status.png": (400, 120),
+    "unknown_avatar.jpg": None,
+    "zzz_gaming.png": None,
+    "zzz_online.png": None,
+}
+
+# 以原始数据使用的默认图片
+BYTES_ASSETS = (
+    "bg_dots.png",
+    "unknown_avatar.jpg",
+    "default_achievement_image.png",
+    "default_header_image.jpg",
+)
+
+_images: Dict[str, Image.Image] = {}
+_bytes: Dict[str, bytes] = {}
+
+
+def load_assets() -> None:
+    """加载并解码 res 目录下的资源，每个资源只加载一次"""
+    start = time.perf_counter()
+
+    for name in BYTES_ASSETS:
+        _bytes[name] = (RES_DIR / name).read_bytes()
+
+    for name, size in IMAGE_ASSETS.items():
+        image = Image.open(RES_DIR / name)
+        image.load()
+        if size is not None and image.size != size:
+            image = image.resize(size, Image.BICUBIC)
+        _images[name] = image
+
+    memory = sum(len(data) for data in _bytes.values()) + sum(
+        image.width * image.height * len(image.getbands()) for image in _images.values()
+    )
+    logger.info(
+        f"已加载 {len(_images) + len(_bytes)} 个资源，"
+        f"占用 {memory / 1024:.1f} KB 内存，耗时 {(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+
+
+def get_image(name: str) -> Image.Image:
+    """获取共享的图片，需要修改时请先 copy()"""
+    if name not in _images:
+        load_assets()
+    return _images[name]
+
+
+def get_bytes(name: str) -> bytes:
+    if name not in _bytes:
+        load_assets()
+    return _bytes[name]
@@ -0,0 +1,126 @@
+import time
+import asyncio
+from nonebot.log import logger
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator
+
+from .ratelimit import TokenBucket
+
+
+class StageTiming:
+    """某个阶段的耗时统计，单位为秒"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, elapsed: float) -> None:
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.last = elapsed
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+class BroadcastScheduler:
+    """并发处理各群的播报，限制总并发数与每个适配器的发送速率
+
+    单个群失败或超时只记录日志，不影响其他群；
+    同一轮播报中可通过 once 在各群间共享相同的渲染结果
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        send_rate: float,
+        send_burst: int,
+        timeout: float,
+    ) -> None:
+        self.concurrency = concurrency
+        self.send_rate = send_rate
+        self.send_burst = send_burst
+        self.timeout = timeout
+        self._buckets: Dict[str, TokenBucket] = {}  # 适配器名称: 令牌桶
+        self.timings: Dict[str, StageTiming] = {}
+        self._results: Dict[Hashable, asyncio.Future] = {}  # 本轮播报的共享结果
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.completed = 0
+        self.failures = 0
+        self.timeouts = 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """记录代码块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.setdefault(name, StageTiming()).record(
+                time.perf_counter() - start
+            )
+
+    async def send(self, adapter: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """按适配器限速后发送"""
+        if adapter not in self._buckets:
+            self._buckets[adapter] = TokenBucket(self.send_rate, self.send_burst)
+
+        with self.stage("throttle"):
+            await self._buckets[adapter].acquire()
+        with self.stage("send"):
+            return await func()
+
+    async def once(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """本轮播报中相同 key 只执行一次 func，其余调用复用其结果"""
+        if key in self._results:
+            self.shared_hits += 1
+        else:
+            self.shared_misses += 1
+            self._results[key] = asyncio.ensure_future(func())
+        # 某个群超时被取消时不影响其他群
+        return await asyncio.shield(self._results[key])
+
+    async def run(self, jobs: Dict[str, Callable[[], Awaitable[Any]]]) -> None:
+        """并发执行各群的播报，jobs 为 parent_id: 播报函数"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_job(parent_id: str, job: Callable[[], Awaitable[Any]]) -> None:
+            async with semaphore:
+                try:
+                    with self.stage("group"):
+                        await asyncio.wait_for(job(), self.timeout)
+                    self.completed += 1
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    logger.error(f"{parent_id} 的播报超时 ({self.timeout} 秒)")
+                except Exception as exc:
+                    self.failures += 1
+                    logger.error(f"{parent_id} 的播报失败: {exc}")
+
+        self._results = {}
+        try:
+            with self.stage("broadcast"):
+                await asyncio.gather(
+                    *(run_job(parent_id, job) for parent_id, job in jobs.items())
+                )
+        finally:
+            self._results = {}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "completed": self.completed,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "shared_hits": self.shared_hits,
+            "shared_misses": self.shared_misses,
+            "stages": {name: timing.stats() for name, timing in self.timings.items()},
+        }
@@ -0,0 +1,298 @@
+import os
+import time
+import pickle
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from nonebot.log import logger
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from .executor import run_io
+
+
+class LRUCache:
+    """按占用字节数限制大小的 LRU 缓存，线程安全，可选过期时间"""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        sizeof: Callable[[Any], int],
+        ttl: Optional[float] = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._expires: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._expires and self._expires[key] <= time.monotonic():
+                self._remove(key)
+            if key not in self._items:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._items[key] = value
+            self._sizes[key] = size
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            self.bytes += size
+            self._evict()
+
+    def _remove(self, key: Hashable) -> None:
+        del self._items[key]
+        self.bytes -= self._sizes.pop(key)
+        self._expires.pop(key, None)
+
+    def _evict(self) -> None:
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self._items)))
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self._expires.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "items": len(self._items),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class SingleFlight:
+    """合并相同 key 的并发调用，只执行一次"""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        if key in self._calls:
+            self.coalesced += 1
+        else:
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda _: self._calls.pop(key, None))
+        # 某个调用方被取消时不影响其他等待者
+        return await asyncio.shield(self._calls[key])
+
+
+class DiskCache:
+    """按总字节数限制大小的磁盘缓存，超出时按 LRU 删除文件
+
+    文件按 key 的哈希分散在 256 个子目录中，写入时先写临时文件再重命名，
+    索引在启动时根据文件的修改时间重建，命中时会更新修改时间
+    """
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key: 文件大小
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._rebuild()
+
+    def _path(self, key: str) -> Path:
+        shard = hashlib.sha1(key.encode("utf-8")).hexdigest()[:2]
+        return self.root / shard / key
+
+    def _rebuild(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        files: List[Tuple[float, str, int]] = []
+        for path in self.root.glob("*/*"):
+            if path.suffix == ".tmp":
+                # 上次写入中断留下的临时文件
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            files.append((stat.st_mtime, path.name, stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._index[key] = size
+            self.bytes += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                if key in self._index:
+                    self.bytes -= self._index.pop(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        temp_path = path.with_name(f"{key}.{threading.get_ident()}.tmp")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if key in self._index:
+                self.bytes -= self._index.pop(key)
+            self._index[key] = len(data)
+            self.bytes += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self.bytes > self.max_bytes:
+            key, size = self._index.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+            self._path(key).unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "items": len(self._index),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def remove_legacy_cache_files(cache_dir: Path) -> int:
+    """删除旧版本直接保存在缓存目录下的图片，返回删除的文件数"""
+    removed = 0
+    for pattern in ("avatar_*", "header_*", "achievement_*"):
+        for path in cache_dir.glob(pattern):
+            if path.is_file():
+                path.unlink()
+                removed += 1
+    return removed
+
+
+class StaleWhileRevalidateCache:
+    """以 pickle 保存在 DiskCache 中的异步缓存
+
+    未超过 ttl 时直接返回；超过 ttl 但未超过 stale_ttl 时先返回旧数据，并在后台刷新；
+    超过 stale_ttl 或没有缓存时等待获取。获取失败时如果有旧数据则返回旧数据
+    """
+
+    def __init__(
+        self, disk_cache: DiskCache, prefix: str, ttl: float, stale_ttl: float
+    ) -> None:
+        self.disk_cache = disk_cache
+        self.prefix = prefix
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._flight = SingleFlight()
+        self._tasks: Set[asyncio.Future] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def _load(self, key: str) -> Optional[Tuple[float, Any]]:
+        data = self.disk_cache.get(f"{self.prefix}{key}.pkl")
+        if data is None:
+            return None
+        try:
+            return pickle.loads(data)
+        except Exception as exc:
+            logger.warning(f"读取缓存 {self.prefix}{key} 失败: {exc}")
+            return None
+
+    def _store(self, key: str, entry: Tuple[float, Any]) -> None:
+        data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        self.disk_cache.put(f"{self.prefix}{key}.pkl", data)
+
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        value = await fetch()
+        await run_io(self._store, key, (time.time(), value))
+        return value
+
+    def _revalidate(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> None:
+        async def revalidate() -> None:
+            try:
+                await self._flight.do(key, lambda: self._refresh(key, fetch))
+            except Exception as exc:
+                logger.warning(f"后台刷新缓存 {key} 失败: {exc}")
+
+        task = asyncio.ensure_future(revalidate())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        if self.ttl <= 0:
+            return await fetch()
+
+        entry = await run_io(self._load, key)
+        age = time.time() - entry[0] if entry is not None else None
+
+        if age is not None and age <= self.ttl:
+            self.hits += 1
+            return entry[1]
+
+        if age is not None and age <= self.stale_ttl:
+            self.stale_hits += 1
+            self._revalidate(key, fetch)
+            return entry[1]
+
+        self.misses += 1
+        try:
+            return await self._flight.do(key, lambda: self._refresh(key, fetch))
+        except Exception:
+            if entry is None:
+                raise
+            logger.warning(f"获取 {key} 失败，使用 {age:.0f} 秒前的缓存")
+            return entry[1]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self._flight.coalesced,
+        }
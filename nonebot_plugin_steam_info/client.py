@@ -0,0 +1,136 @@
+import httpx
+from nonebot.log import logger
+from typing import Any, Dict, List, Optional
+
+
+# 每个 Steam 主机单独使用一个连接池
+POOL_HOSTS: Dict[str, List[str]] = {
+    "api": ["all://api.steampowered.com"],
+    "community": ["all://steamcommunity.com"],
+    "cdn": ["all://*.steamstatic.com", "all://*.akamaihd.net"],
+}
+
+_client: Optional[httpx.AsyncClient] = None
+_client_options: Dict[str, Any] = {}  # configure_client 设置的参数
+_closed = False  # close_client 后不再创建新的客户端
+_transports: Dict[str, httpx.AsyncHTTPTransport] = {}
+_request_counts: Dict[str, int] = {}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def _count_request(request: httpx.Request) -> None:
+    host = request.url.host
+    _request_counts[host] = _request_counts.get(host, 0) + 1
+
+
+def configure_client(
+    proxy: Optional[str] = None,
+    http2: bool = True,
+    max_connections: int = 20,
+    max_keepalive_connections: int = 10,
+    keepalive_expiry: float = 30.0,
+) -> None:
+    """设置共享 HTTP 客户端的参数，在 init_client 或首次 get_client 时生效"""
+    _client_options.update(
+        proxy=proxy,
+        http2=http2,
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+
+
+def _create_client(
+    proxy: Optional[str] = None,
+    http2: bool = True,
+    max_connections: int = 20,
+    max_keepalive_connections: int = 10,
+    keepalive_expiry: float = 30.0,
+) -> httpx.AsyncClient:
+    if http2 and not _http2_available():
+        logger.warning("未安装 h2，Steam 请求将使用 HTTP/1.1")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+
+    _transports.clear()
+    mounts = {}
+    for name, patterns in POOL_HOSTS.items():
+        transport = httpx.AsyncHTTPTransport(http2=http2, limits=limits, proxy=proxy)
+        _transports[name] = transport
+        for pattern in patterns:
+            mounts[pattern] = transport
+
+    # 其他主机（如聊天平台的图片）直接连接，不使用 Steam 的代理
+    _transports["default"] = httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+
+    return httpx.AsyncClient(
+        transport=_transports["default"],
+        mounts=mounts,
+        event_hooks={"request": [_count_request]},
+    )
+
+
+async def init_client() -> httpx.AsyncClient:
+    """按 configure_client 设置的参数创建共享的 HTTP 客户端，已有的客户端会先关闭"""
+    global _client, _closed
+
+    if _client is not None:
+        await _client.aclose()
+    _client = _create_client(**_client_options)
+    _closed = False
+    return _client
+
+
+def get_client() -> httpx.AsyncClient:
+    """获取共享的 HTTP 客户端
+
+    在 init_client 之前调用时按 configure_client 设置的参数创建，
+    close_client 后不会再重新创建
+    """
+    global _client
+
+    if _client is not None:
+        return _client
+    if _closed:
+        raise RuntimeError("HTTP 客户端已关闭")
+    _client = _create_client(**_client_options)
+    return _client
+
+
+async def close_client() -> None:
+    global _client, _closed
+    _closed = True
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _transports.clear()
+
+
+def get_pool_stats() -> Dict[str, Dict[str, int]]:
+    """获取各连接池的连接数统计"""
+    stats = {}
+    for name, transport in _transports.items():
+        connections = transport._pool.connections
+        stats[name] = {
+            "connections": len(connections),
+            "idle": sum(1 for conn in connections if conn.is_idle()),
+            "http2": sum(1 for conn in connections if "HTTP/2" in conn.info()),
+        }
+    return stats
+
+
+def get_request_counts() -> Dict[str, int]:
+    """获取每个主机的请求数"""
+    return dict(_request_counts)
@@ -6,11 +6,46 @@ class Config(BaseModel):
     steam_api_key: Union[str, List[str]]
     proxy: Optional[str] = None
     steam_request_interval: int = 300  # seconds
+    steam_request_concurrency: int = 4
+    steam_asset_concurrency: int = 8
+    steam_asset_timeout: float = 10.0  # seconds
+    steam_avatar_concurrency: int = 100
+    steam_api_daily_limit: int = 100000  # 每个 API Key
+    steam_api_rate_limit: float = 1.0  # 每个 API Key 每秒请求数
+    steam_api_burst: int = 10
     steam_broadcast_type: str = "part"  # all, part, none
+    steam_broadcast_concurrency: int = 8
+    steam_broadcast_send_rate: float = 1.0  # 每个适配器每秒发送的消息数
+    steam_broadcast_send_burst: int = 5
+    steam_broadcast_timeout: float = 60.0  # 每个群, seconds
     steam_disable_broadcast_on_startup: bool = False
+    steam_storage: str = "json"  # json, sqlite
+    steam_render_executor: str = "thread"  # thread, process
+    steam_render_workers: Optional[int] = None
+    steam_io_workers: int = 4
+    steam_render_farm_workers: int = 0  # 0 为不启用
+    steam_render_farm_max_queue: int = 8
+    steam_background_reduce_factor: int = 4  # 1 为原尺寸
+    steam_profile_image_format: str = "png"  # png, png8, jpeg, webp
+    steam_friends_image_format: str = "png"
+    steam_start_gaming_image_format: str = "png"
+    steam_image_quality: int = 85
+    steam_png_compress_level: int = 6
+    steam_friend_tile_cache_bytes: int = 32 * 1024 * 1024
+    steam_avatar_cache_bytes: int = 16 * 1024 * 1024
+    steam_check_cache_ttl: float = 30.0
+    steam_check_max_age: Optional[int] = None  # None 为与请求间隔相同
+    steam_profile_cache_ttl: float = 600.0  # 0 为不缓存
+    steam_profile_cache_stale_ttl: float = 86400.0
+    steam_cache_max_bytes: int = 256 * 1024 * 1024
+    steam_cache_revalidate_interval: float = 86400.0  # seconds
     steam_font_regular_path: Optional[str] = "fonts/MiSans-Regular.ttf"
     steam_font_light_path: Optional[str] = "fonts/MiSans-Light.ttf"
     steam_font_bold_path: Optional[str] = "fonts/MiSans-Bold.ttf"
+    steam_http2: bool = True
+    steam_http_max_connections: int = 20  # 每个主机
+    steam_http_max_keepalive_connections: int = 10  # 每个主机
+    steam_http_keepalive_expiry: float = 30.0  # seconds
 
     @validator("steam_api_key", pre=True)
     def ensure_list(cls, v):
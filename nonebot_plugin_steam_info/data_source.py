@@ -1,118 +1,212 @@
 import json
 import time
+import hashlib
 from PIL import Image
 from pathlib import Path
-from typing import Any, List, Dict, Optional, Tuple
+from typing import Any, List, Dict, Iterable, Optional, Set, Tuple
 
 from .models import Player, ProcessedPlayer
+from .assets import get_image
+from .storage import SqliteStore
+from .executor import submit_write
+
+
+def save_json(save_path: Path, content: Any) -> None:
+    """在事件循环中序列化，在后台线程中写入文件"""
+    submit_write(save_path.write_text, json.dumps(content, indent=4), "utf-8")
 
 
 class BindData:
-    def __init__(self, save_path: Path) -> None:
+    def __init__(self, save_path: Path, store: Optional[SqliteStore] = None) -> None:
         self.content: Dict[str, List[Dict[str, str]]] = {}
+        # steam_id: {parent_id: data}
+        self._by_steam_id: Dict[str, Dict[str, Dict[str, str]]] = {}
+        # (parent_id, user_id): data
+        self._by_user: Dict[Tuple[str, str], Dict[str, str]] = {}
         self._save_path = save_path
-
-        if save_path.exists():
+        self._table = store.table("bind_data") if store is not None else None
+
+        rows = self._table.load() if self._table is not None else None
+        if rows is not None:
+            for row in rows.values():
+                parent_id = row.pop("parent_id")
+                self.content.setdefault(parent_id, []).append(row)
+        elif save_path.exists():
             self.content = json.loads(Path(save_path).read_text("utf-8"))
+            if self._table is not None:
+                # 从 JSON 迁移
+                self.save()
         else:
             self.save()
 
+        for parent_id, entries in self.content.items():
+            for data in entries:
+                self._index(parent_id, data)
+
     def save(self) -> None:
-        with open(self._save_path, "w", encoding="utf-8") as f:
-            json.dump(self.content, f, indent=4)
+        if self._table is not None:
+            self._table.save(
+                {
+                    f"{parent_id}\x1f{data['user_id']}": {
+                        **data,
+                        "parent_id": parent_id,
+                    }
+                    for parent_id, entries in self.content.items()
+                    for data in entries
+                }
+            )
+            return
+
+        save_json(self._save_path, self.content)
+
+    def _index(self, parent_id: str, data: Dict[str, str]) -> None:
+        # 与按顺序查找一致，同一个键只索引第一条数据
+        self._by_user.setdefault((parent_id, data["user_id"]), data)
+        self._by_steam_id.setdefault(data["steam_id"], {}).setdefault(parent_id, data)
+
+    def _unindex(self, parent_id: str, data: Dict[str, str]) -> None:
+        entries = self.content.get(parent_id, [])
+
+        key = (parent_id, data["user_id"])
+        if self._by_user.get(key) is data:
+            del self._by_user[key]
+            for other in entries:
+                if other is not data and other["user_id"] == data["user_id"]:
+                    self._by_user[key] = other
+                    break
+
+        parents = self._by_steam_id.get(data["steam_id"], {})
+        if parents.get(parent_id) is data:
+            del parents[parent_id]
+            for other in entries:
+                if other is not data and other["steam_id"] == data["steam_id"]:
+                    parents[parent_id] = other
+                    break
+            if not parents:
+                del self._by_steam_id[data["steam_id"]]
+
+    def _reindex_steam_id(self, parent_id: str, steam_id: str) -> None:
+        """按顺序重新查找 parent 中第一条绑定了 steam_id 的数据"""
+        parents = self._by_steam_id.setdefault(steam_id, {})
+        parents.pop(parent_id, None)
+        for data in self.content.get(parent_id, []):
+            if data["steam_id"] == steam_id:
+                parents[parent_id] = data
+                break
+        if not parents:
+            del self._by_steam_id[steam_id]
 
     def add(self, parent_id: str, content: Dict[str, str]) -> None:
         if parent_id not in self.content:
             self.content[parent_id] = [content]
         else:
             self.content[parent_id].append(content)
+        self._index(parent_id, content)
 
     def remove(self, parent_id: str, user_id: str) -> None:
-        if parent_id not in self.content:
+        data = self._by_user.get((parent_id, user_id))
+        if data is None:
             return
-        for data in self.content[parent_id]:
-            if data["user_id"] == user_id:
-                self.content[parent_id].remove(data)
-                break
+        self.content[parent_id].remove(data)
+        self._unindex(parent_id, data)
 
-    def update(self, parent_id: str, content: Dict[str, str]) -> None:
+    def update(self, parent_id: str, content: List[Dict[str, str]]) -> None:
+        # 先移出旧列表，以免 _unindex 把索引指向同样即将被替换的旧数据
+        for data in self.content.pop(parent_id, []):
+            self._unindex(parent_id, data)
         self.content[parent_id] = content
+        for data in content:
+            self._index(parent_id, data)
+
+    def set_steam_id(self, parent_id: str, user_id: str, steam_id: str) -> None:
+        data = self._by_user.get((parent_id, user_id))
+        if data is None:
+            return
+        old_steam_id = data["steam_id"]
+        data["steam_id"] = steam_id
+        self._reindex_steam_id(parent_id, old_steam_id)
+        self._reindex_steam_id(parent_id, steam_id)
 
     def get(self, parent_id: str, user_id: str) -> Optional[Dict[str, str]]:
-        if parent_id not in self.content:
-            return None
-        for data in self.content[parent_id]:
-            if data["user_id"] == user_id:
-                if not data.get("nickname"):
-                    data["nickname"] = None
-                return data
-        return None
+        data = self._by_user.get((parent_id, user_id))
+        if data is not None and not data.get("nickname"):
+            data["nickname"] = None
+        return data
 
     def get_by_steam_id(
         self, parent_id: str, steam_id: str
     ) -> Optional[Dict[str, str]]:
-        if parent_id not in self.content:
-            return None
-        for data in self.content[parent_id]:
-            if data["steam_id"] == steam_id:
-                if not data.get("nickname"):
-                    data["nickname"] = None
-                return data
-        return None
+        data = self._by_steam_id.get(steam_id, {}).get(parent_id)
+        if data is not None and not data.get("nickname"):
+            data["nickname"] = None
+        return data
+
+    def get_parents(self, steam_id: str) -> List[str]:
+        """获取绑定了 steam_id 的所有 parent"""
+        return list(self._by_steam_id.get(steam_id, {}))
 
     def get_all(self, parent_id: str) -> List[str]:
         if parent_id not in self.content:
             return []
 
-        result = []
-
-        for data in self.content[parent_id]:
-            if not data["steam_id"] in result:
-                result.append(data["steam_id"])
-
-        return result
+        return list(dict.fromkeys(data["steam_id"] for data in self.content[parent_id]))
 
     def get_all_steam_id(self) -> List[str]:
-        result = []
-        for parent_id in self.content:
-            for data in self.content[parent_id]:
-                if not data["steam_id"] in result:
-                    result.append(data["steam_id"])
-        return result
+        return list(self._by_steam_id)
 
 
 class SteamInfoData:
-    def __init__(self, save_path: Path) -> None:
+    def __init__(self, save_path: Path, store: Optional[SqliteStore] = None) -> None:
         self.content: List[ProcessedPlayer] = []
+        self._index: Dict[str, ProcessedPlayer] = {}  # steamid: player
+        self.updated_at = 0.0  # 上次成功更新的时间，重启后视为过期
+        self.updated_ids: Set[str] = set()  # 上次更新时获取到的 Steam ID
         self._save_path = save_path
+        self._table = store.table("steam_info") if store is not None else None
 
-        if save_path.exists():
+        rows = self._table.load() if self._table is not None else None
+        if rows is not None:
+            self.content = list(rows.values())
+        elif save_path.exists():
             self.content = json.loads(save_path.read_text("utf-8"))
             if isinstance(self.content, dict):
                 self.content = []
                 self.save()
+            elif self._table is not None:
+                # 从 JSON 迁移
+                self._index = {player["steamid"]: player for player in self.content}
+                self.save()
         else:
             self.save()
 
+        self._index = {player["steamid"]: player for player in self.content}
+
     def save(self) -> None:
-        with open(self._save_path, "w", encoding="utf-8") as f:
-            json.dump(self.content, f, indent=4)
+        if self._table is not None:
+            self._table.save(self._index)
+            return
+
+        save_json(self._save_path, self.content)
 
     def update(self, player: ProcessedPlayer) -> None:
+        if player["steamid"] in self._index:
+            self.content.remove(self._index[player["steamid"]])
         self.content.append(player)
+        self._index[player["steamid"]] = player
+
+    def update_by_players(self, players: List[Player]) -> Dict[str, ProcessedPlayer]:
+        """更新玩家数据，返回 gameextrainfo 或 personastate 发生变化的玩家的旧数据"""
+        changed: Dict[str, ProcessedPlayer] = {}
 
-    def update_by_players(self, players: List[Player]):
         # 将 Player 转换为 ProcessedPlayer
-        processed_players = []
         for player in players:
-            old_player = self.get_player(player["steamid"])
+            old_player = self._index.get(player["steamid"])
 
             if old_player is None:
                 if player.get("gameextrainfo") is not None:
                     player["game_start_time"] = int(time.time())
                 else:
                     player["game_start_time"] = None
-                processed_players.append(player)
             else:
                 if (
                     player.get("gameextrainfo") is not None
@@ -138,84 +232,103 @@ class SteamInfoData:
                         player["game_start_time"] = old_player["game_start_time"]
                 else:
                     player["game_start_time"] = None
-                processed_players.append(player)
 
-        self.content = processed_players
+                if (
+                    player.get("gameextrainfo") != old_player.get("gameextrainfo")
+                    or player["personastate"] != old_player["personastate"]
+                ):
+                    changed[player["steamid"]] = old_player
+
+            self._index[player["steamid"]] = player
 
-    def get_player(self, steam_id: str) -> Optional[Player]:
-        for player in self.content:
-            if player["steamid"] == steam_id:
-                return player
-        return None
+        self.content = list(self._index.values())
 
-    def get_players(self, steam_ids: List[str]) -> List[Player]:
-        result = []
-        for player in self.content:
-            if player["steamid"] in steam_ids:
-                result.append(player)
-        return result
+        return changed
+
+    def retain(self, steam_ids: Iterable[str]) -> None:
+        """只保留 steam_ids 中的玩家"""
+        steam_ids = set(steam_ids)
+        self._index = {
+            steam_id: player
+            for steam_id, player in self._index.items()
+            if steam_id in steam_ids
+        }
+        self.content = list(self._index.values())
+
+    def mark_updated(self, steam_ids: Iterable[str]) -> None:
+        self.updated_at = time.time()
+        self.updated_ids = set(steam_ids)
+
+    def get_age(self) -> float:
+        """距上次更新的秒数"""
+        return time.time() - self.updated_at
+
+    def get_player(self, steam_id: str) -> Optional[ProcessedPlayer]:
+        return self._index.get(steam_id)
+
+    def get_players(self, steam_ids: Iterable[str]) -> List[ProcessedPlayer]:
+        return [
+            self._index[steam_id] for steam_id in steam_ids if steam_id in self._index
+        ]
 
     def compare(
         self, old_players: List[Player], new_players: List[Player]
     ) -> List[Dict[str, Any]]:
         result = []
 
+        old_index = {old_player["steamid"]: old_player for old_player in old_players}
+
         for player in new_players:
-            for old_player in old_players:
-                if player["steamid"] == old_player["steamid"]:
-                    if player.get("gameextrainfo") != old_player.get("gameextrainfo"):
-                        if (
-                            player.get("gameextrainfo") is not None
-                            and old_player.get("gameextrainfo") is not None
-                        ):
-                            result.append(
-                                {
-                                    "type": "change",
-                                    "player": player,
-                                    "old_player": old_player,
-                                }
-                            )
-                        elif old_player.get("gameextrainfo") is not None:
-                            result.append(
-                                {
-                                    "type": "stop",
-                                    "player": player,
-                                    "old_player": old_player,
-                                }
-                            )
-                        elif player.get("gameextrainfo") is not None :
-                            result.append(
-                                {
-                                    "type": "start",
-                                    "player": player,
-                                    "old_player": old_player,
-                                }
-                            )
-                        else:
-                            result.append(
-                                {
-                                    "type": "error",
-                                    "player": player,
-                                    "old_player": old_player,
-                                }
-                            )
+            old_player = old_index.get(player["steamid"])
+            if old_player is None:
+                continue
+            if player.get("gameextrainfo") == old_player.get("gameextrainfo"):
+                continue
+
+            if (
+                player.get("gameextrainfo") is not None
+                and old_player.get("gameextrainfo") is not None
+            ):
+                entry_type = "change"
+            elif old_player.get("gameextrainfo") is not None:
+                entry_type = "stop"
+            elif player.get("gameextrainfo") is not None:
+                entry_type = "start"
+            else:
+                entry_type = "error"
+
+            result.append(
+                {"type": entry_type, "player": player, "old_player": old_player}
+            )
+
         return result
 
 
 class ParentData:
-    def __init__(self, save_path: Path) -> None:
+    def __init__(self, save_path: Path, store: Optional[SqliteStore] = None) -> None:
         self.content: Dict[str, str] = {}  # parent_id: name
+        self.versions: Dict[str, int] = {}  # parent_id: 头像与名称的更新次数
         self._save_path = save_path
+        self._table = store.table("parent_data") if store is not None else None
 
-        if not save_path.exists():
+        rows = self._table.load() if self._table is not None else None
+        if rows is not None:
+            self.content = rows
+        elif not save_path.exists():
             save_path.parent.mkdir(parents=True, exist_ok=True)
             self.save()
         else:
             self.content = json.loads(save_path.read_text("utf-8"))
+            if self._table is not None:
+                # 从 JSON 迁移
+                self.save()
 
     def save(self) -> None:
-        with open(self._save_path, "w", encoding="utf-8") as f:
-            json.dump(self.content, f, indent=4)
+        if self._table is not None:
+            self._table.save(self.content)
+            return
+
+        save_json(self._save_path, self.content)
 
     def update(self, parent_id: str, avatar: Image.Image, name: str) -> None:
         self.content[parent_id] = name
@@ -223,13 +336,11 @@ class ParentData:
         # 保存图片
         avatar_path = self._save_path.parent / f"{parent_id}.png"
         avatar.save(avatar_path)
+        self.versions[parent_id] = self.versions.get(parent_id, 0) + 1
 
     def get(self, parent_id: str) -> Tuple[Image.Image, str]:
         if parent_id not in self.content:
-            return (
-                Image.open(Path(__file__).parent / "res/unknown_avatar.jpg"),
-                parent_id,
-            )
+            return get_image("unknown_avatar.jpg"), parent_id
         avatar_path = self._save_path.parent / f"{parent_id}.png"
         return Image.open(avatar_path), self.content[parent_id]
 
@@ -237,18 +348,28 @@ class ParentData:
 class DisableParentData:
     """储存禁用 Steam 通知的 parent"""
 
-    def __init__(self, save_path: Path) -> None:
+    def __init__(self, save_path: Path, store: Optional[SqliteStore] = None) -> None:
         self.content: List[str] = []
         self._save_path = save_path
+        self._table = store.table("disable_parent_data") if store is not None else None
 
-        if save_path.exists():
+        rows = self._table.load() if self._table is not None else None
+        if rows is not None:
+            self.content = list(rows)
+        elif save_path.exists():
             self.content = json.loads(save_path.read_text("utf-8"))
+            if self._table is not None:
+                # 从 JSON 迁移
+                self.save()
         else:
             self.save()
 
     def save(self) -> None:
-        with open(self._save_path, "w", encoding="utf-8") as f:
-            json.dump(self.content, f, indent=4)
+        if self._table is not None:
+            self._table.save(dict.fromkeys(self.content, True))
+            return
+
+        save_json(self._save_path, self.content)
 
     def add(self, parent_id: str) -> None:
         if parent_id not in self.content:
@@ -262,3 +383,47 @@ class DisableParentData:
 
     def is_disabled(self, parent_id: str) -> bool:
         return parent_id in self.content
+
+
+class ApiKeyUsageData:
+    """储存每个 API Key 当天的调用次数，重启后继续计算每日配额
+
+    不保存 API Key 本身，以其哈希作为键
+    """
+
+    def __init__(self, save_path: Path, store: Optional[SqliteStore] = None) -> None:
+        self.content: Dict[str, Dict[str, Any]] = {}  # key 哈希: {"day", "calls"}
+        self._save_path = save_path
+        self._table = store.table("api_key_usage") if store is not None else None
+
+        rows = self._table.load() if self._table is not None else None
+        if rows is not None:
+            self.content = rows
+        elif save_path.exists():
+            self.content = json.loads(save_path.read_text("utf-8"))
+            if self._table is not None:
+                # 从 JSON 迁移
+                self.save()
+        else:
+            self.save()
+
+    def save(self) -> None:
+        if self._table is not None:
+            self._table.save(self.content)
+            return
+
+        save_json(self._save_path, self.content)
+
+    @staticmethod
+    def _hash(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+    def get(self, key: str, day: str) -> int:
+        """获取 key 在 day 的调用次数"""
+        usage = self.content.get(self._hash(key))
+        if usage is None or usage["day"] != day:
+            return 0
+        return usage["calls"]
+
+    def set(self, key: str, day: str, calls: int) -> None:
+        self.content[self._hash(key)] = {"day": day, "calls": calls}
@@ -1,30 +1,56 @@
 import numpy as np
 from io import BytesIO
 from pathlib import Path
-from typing import List, Dict, Tuple
+from nonebot.log import logger
+from typing import Any, Callable, List, Dict, Optional, Tuple
 from colorsys import rgb_to_hsv, hsv_to_rgb
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
 
-from .utils import hex_to_rgb
-from .models import DrawPlayerStatusData, Achievements
+from .cache import LRUCache
+from .assets import get_image
+from .utils import IMAGE_FORMATS, hex_to_rgb, image_to_bytes
+from .models import DrawPlayerStatusData, Achievements, PlayerData
 
 
 WIDTH = 400
 PARENT_AVATAR_SIZE = 72
 MEMBER_AVATAR_SIZE = 50
-
-unknown_avatar_path = Path(__file__).parent / "res/unknown_avatar.jpg"
-parent_status_path = Path(__file__).parent / "res/parent_status.png"
-friends_search_path = Path(__file__).parent / "res/friends_search.png"
-busy_path = Path(__file__).parent / "res/busy.png"
-zzz_online_path = Path(__file__).parent / "res/zzz_online.png"
-zzz_gaming_path = Path(__file__).parent / "res/zzz_gaming.png"
-gaming_path = Path(__file__).parent / "res/gaming.png"
+GAMING_AVATAR_SIZE = 66
+PROFILE_AVATAR_SIZE = 200
 
 font_regular_path = None
 font_light_path = None
 font_bold_path = None
 
+background_reduce_factor = 4
+
+# 各类卡片的编码参数: profile, friends, start_gaming
+image_encoders: Dict[str, Dict[str, Any]] = {}
+
+
+# 绘图中用到的字号，设置字体路径时预先加载
+FONT_SIZES = {
+    "regular": (17, 18, 19, 20, 22, 26),
+    "light": (18, 22, 26, 40),
+    "bold": (14, 20),
+}
+
+_fonts: Dict[Tuple[str, int], ImageFont.FreeTypeFont] = {}
+
+# 好友状态行缓存，键为 (avatarhash, 名称, 昵称, 状态, personastate)
+friend_tile_cache = LRUCache(
+    32 * 1024 * 1024,
+    lambda image: image.width * image.height * len(image.getbands()),
+)
+
+
+def get_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    """获取字体，每个 (路径, 字号) 只加载一次"""
+    key = (path, size)
+    if key not in _fonts:
+        _fonts[key] = ImageFont.truetype(path, size)
+    return _fonts[key]
+
 
 def set_font_paths(regular_path, light_path, bold_path):
     global font_regular_path, font_light_path, font_bold_path
@@ -33,6 +59,31 @@ def set_font_paths(regular_path, light_path, bold_path):
     font_light_path = str((base_dir / light_path).resolve())
     font_bold_path = str((base_dir / bold_path).resolve())
 
+    _fonts.clear()
+    friend_tile_cache.clear()
+    paths = {
+        "regular": font_regular_path,
+        "light": font_light_path,
+        "bold": font_bold_path,
+    }
+    for name, sizes in FONT_SIZES.items():
+        if not Path(paths[name]).exists():
+            # 字体缺失由 check_font 报错
+            continue
+        for size in sizes:
+            get_font(paths[name], size)
+
+
+def set_background_reduce_factor(factor: int):
+    """设置背景模糊前的缩小倍数，1 为在原尺寸上模糊"""
+    global background_reduce_factor
+    background_reduce_factor = factor
+
+
+def set_friend_tile_cache_size(max_bytes: int):
+    """设置好友状态行缓存的最大字节数"""
+    friend_tile_cache.resize(max_bytes)
+
 
 def check_font():
     if not Path(font_regular_path).exists():
@@ -54,6 +105,32 @@ personastate_colors = {
 }
 
 
+def set_image_encoder(
+    card_type: str, image_format: str, quality: int, compress_level: int
+):
+    """设置某类卡片的编码格式与参数"""
+    if image_format not in IMAGE_FORMATS:
+        logger.error(f"未知的图片格式: {image_format}，{card_type} 将使用 png")
+        image_format = "png"
+    image_encoders[card_type] = {
+        "image_format": image_format,
+        "quality": quality,
+        "compress_level": compress_level,
+    }
+
+
+def encode_image(image: Image.Image, card_type: Optional[str] = None) -> bytes:
+    """按卡片类型的设置编码图片，未设置时编码为 PNG"""
+    return image_to_bytes(image, **image_encoders.get(card_type, {}))
+
+
+def draw_to_bytes(
+    draw_func: Callable[..., Image.Image], *args, card_type: Optional[str] = None
+) -> bytes:
+    """绘制并编码，便于在执行器中一次完成"""
+    return encode_image(draw_func(*args), card_type)
+
+
 def vertically_concatenate_images(images: List[Image.Image]) -> Image.Image:
     widths, heights = zip(*(i.size for i in images))
     total_width = max(widths)
@@ -72,15 +149,17 @@ def vertically_concatenate_images(images: List[Image.Image]) -> Image.Image:
 def draw_start_gaming(
     avatar: Image.Image, friend_name: str, game_name: str, nickname: str = None
 ):
-    canvas = Image.open(gaming_path)
-    canvas.paste(avatar.resize((66, 66), Image.BICUBIC), (15, 20))
+    canvas = get_image("gaming.png").copy()
+    if avatar.size != (GAMING_AVATAR_SIZE, GAMING_AVATAR_SIZE):
+        avatar = avatar.resize((GAMING_AVATAR_SIZE, GAMING_AVATAR_SIZE), Image.BICUBIC)
+    canvas.paste(avatar, (15, 20))
 
     # 绘制名称
     draw = ImageDraw.Draw(canvas)
     draw.text(
         (104, 14),
         f"{friend_name} ({nickname})" if nickname is not None else friend_name,
-        font=ImageFont.truetype(font_regular_path, 19),
+        font=get_font(font_regular_path, 19),
         fill=hex_to_rgb("e3ffc2"),
     )
 
@@ -88,7 +167,7 @@ def draw_start_gaming(
     draw.text(
         (103, 42),
         "正在玩",
-        font=ImageFont.truetype(font_regular_path, 17),
+        font=get_font(font_regular_path, 17),
         fill=hex_to_rgb("969696"),
     )
 
@@ -96,7 +175,7 @@ def draw_start_gaming(
     draw.text(
         (104, 66),
         game_name,
-        font=ImageFont.truetype(font_bold_path, 14),
+        font=get_font(font_bold_path, 14),
         fill=hex_to_rgb("91c257"),
     )
 
@@ -108,7 +187,7 @@ def draw_parent_status(parent_avatar: Image.Image, parent_name: str) -> Image.Im
         (PARENT_AVATAR_SIZE, PARENT_AVATAR_SIZE), Image.BICUBIC
     )
 
-    canvas = Image.open(parent_status_path).resize((WIDTH, 120), Image.BICUBIC)
+    canvas = get_image("parent_status.png").copy()
 
     draw = ImageDraw.Draw(canvas)
 
@@ -120,7 +199,7 @@ def draw_parent_status(parent_avatar: Image.Image, parent_name: str) -> Image.Im
     draw.text(
         (16 + PARENT_AVATAR_SIZE + 16, avatar_height + 12),
         parent_name,
-        font=ImageFont.truetype(font_bold_path, 20),
+        font=get_font(font_bold_path, 20),
         fill=hex_to_rgb("6dcff6"),
     )
 
@@ -128,7 +207,7 @@ def draw_parent_status(parent_avatar: Image.Image, parent_name: str) -> Image.Im
     draw.text(
         (16 + PARENT_AVATAR_SIZE + 16, avatar_height + 20 + 16),
         "在线",
-        font=ImageFont.truetype(font_light_path, 18),
+        font=get_font(font_light_path, 18),
         fill=hex_to_rgb("4c91ac"),
     )
 
@@ -138,7 +217,7 @@ def draw_parent_status(parent_avatar: Image.Image, parent_name: str) -> Image.Im
 def draw_friends_search() -> Image.Image:
     canvas = Image.new("RGB", (WIDTH, 50), hex_to_rgb("434953"))
 
-    friends_search = Image.open(friends_search_path)
+    friends_search = get_image("friends_search.png")
 
     canvas.paste(friends_search, (WIDTH - friends_search.width, 0))
 
@@ -148,7 +227,7 @@ def draw_friends_search() -> Image.Image:
         (24, 10),
         "好友",
         hex_to_rgb("b7ccd5"),
-        font=ImageFont.truetype(font_regular_path, 20),
+        font=get_font(font_regular_path, 20),
     )
 
     return canvas
@@ -161,9 +240,10 @@ def draw_friend_status(
     personastate: int,
     nickname: str = None,
 ) -> Image.Image:
-    friend_avatar = friend_avatar.resize(
-        (MEMBER_AVATAR_SIZE, MEMBER_AVATAR_SIZE), Image.BICUBIC
-    )
+    if friend_avatar.size != (MEMBER_AVATAR_SIZE, MEMBER_AVATAR_SIZE):
+        friend_avatar = friend_avatar.resize(
+            (MEMBER_AVATAR_SIZE, MEMBER_AVATAR_SIZE), Image.BICUBIC
+        )
 
     canvas = Image.new("RGB", (WIDTH, 64), hex_to_rgb("1e2024"))
 
@@ -178,10 +258,10 @@ def draw_friend_status(
         canvas = draw_friend_status(friend_avatar, friend_name, status, 1, nickname)
         draw = ImageDraw.Draw(canvas)
 
-        busy = Image.open(busy_path)
+        busy = get_image("busy.png")
 
         name_width = int(
-            draw.textlength(display_name, font=ImageFont.truetype(font_bold_path, 20))
+            draw.textlength(display_name, font=get_font(font_bold_path, 20))
         )
 
         canvas.paste(busy, (22 + MEMBER_AVATAR_SIZE + 16 + name_width + 4, 18))
@@ -193,10 +273,10 @@ def draw_friend_status(
         canvas = draw_friend_status(friend_avatar, friend_name, status, 1, nickname)
         draw = ImageDraw.Draw(canvas)
 
-        zzz = Image.open(zzz_online_path if status == "在线" else zzz_gaming_path)
+        zzz = get_image("zzz_online.png" if status == "在线" else "zzz_gaming.png")
 
         name_width = int(
-            draw.textlength(display_name, font=ImageFont.truetype(font_bold_path, 20))
+            draw.textlength(display_name, font=get_font(font_bold_path, 20))
         )
 
         canvas.paste(zzz, (22 + MEMBER_AVATAR_SIZE + 16 + name_width + 8, 18))
@@ -217,7 +297,7 @@ def draw_friend_status(
     draw.text(
         (22 + MEMBER_AVATAR_SIZE + 18, 12),
         display_name,
-        font=ImageFont.truetype(font_bold_path, 20),
+        font=get_font(font_bold_path, 20),
         fill=fill[0],
     )
 
@@ -225,13 +305,35 @@ def draw_friend_status(
     draw.text(
         (22 + MEMBER_AVATAR_SIZE + 16, 36),
         status,
-        font=ImageFont.truetype(font_regular_path, 18),
+        font=get_font(font_regular_path, 18),
         fill=fill[1],
     )
 
     return canvas
 
 
+def get_friend_status_tile(data: Dict[str, str]) -> Image.Image:
+    """获取好友状态行，未变化的行直接使用缓存"""
+    key = (
+        data["avatarhash"],
+        data["name"],
+        data["nickname"],
+        data["status"],
+        data["personastate"],
+    )
+    tile = friend_tile_cache.get(key)
+    if tile is None:
+        tile = draw_friend_status(
+            data["avatar"],
+            data["name"],
+            data["status"],
+            data["personastate"],
+            data["nickname"],
+        )
+        friend_tile_cache.put(key, tile)
+    return tile
+
+
 def draw_gaming_friends_status(data: List[Dict[str, str]]) -> Image.Image:
     # 排序数据，按照游戏名称字母表顺序排序
     data.sort(key=lambda x: x["status"])
@@ -249,16 +351,11 @@ def draw_gaming_friends_status(data: List[Dict[str, str]]) -> Image.Image:
         (22, 22),
         "游戏中",
         hex_to_rgb("c5d6d4"),
-        font=ImageFont.truetype(font_regular_path, 22),
+        font=get_font(font_regular_path, 22),
     )
 
     # 绘制好友头像和名称
-    friends_status_list = [
-        draw_friend_status(
-            d["avatar"], d["name"], d["status"], d["personastate"], d["nickname"]
-        )
-        for d in data
-    ]
+    friends_status_list = [get_friend_status_tile(d) for d in data]
 
     # 拼接好友头像和名称
     for i, friend_status in enumerate(friends_status_list):
@@ -281,7 +378,7 @@ def draw_online_friends_status(data: List[Dict[str, str]]) -> Image.Image:
         (22, 22),
         "在线好友",
         hex_to_rgb("c5d6d4"),
-        font=ImageFont.truetype(font_regular_path, 22),
+        font=get_font(font_regular_path, 22),
     )
 
     # 绘制在线人数
@@ -289,16 +386,11 @@ def draw_online_friends_status(data: List[Dict[str, str]]) -> Image.Image:
         (115, 25),
         f"({len(data)})",
         hex_to_rgb("67665c"),
-        font=ImageFont.truetype(font_regular_path, 18),
+        font=get_font(font_regular_path, 18),
     )
 
     # 绘制好友头像和名称
-    friends_status_list = [
-        draw_friend_status(
-            d["avatar"], d["name"], d["status"], d["personastate"], d["nickname"]
-        )
-        for d in data
-    ]
+    friends_status_list = [get_friend_status_tile(d) for d in data]
 
     # 拼接好友头像和名称
     for i, friend_status in enumerate(friends_status_list):
@@ -321,7 +413,7 @@ def draw_offline_friends_status(data: List[Dict[str, str]]) -> Image.Image:
         (22, 22),
         "离线",
         hex_to_rgb("c5d6d4"),
-        font=ImageFont.truetype(font_regular_path, 22),
+        font=get_font(font_regular_path, 22),
     )
 
     # 绘制离线人数
@@ -329,16 +421,11 @@ def draw_offline_friends_status(data: List[Dict[str, str]]) -> Image.Image:
         (72, 25),
         f"({len(data)})",
         hex_to_rgb("67665c"),
-        font=ImageFont.truetype(font_regular_path, 18),
+        font=get_font(font_regular_path, 18),
     )
 
     # 绘制好友头像和名称
-    friends_status_list = [
-        draw_friend_status(
-            d["avatar"], d["name"], d["status"], d["personastate"], d["nickname"]
-        )
-        for d in data
-    ]
+    friends_status_list = [get_friend_status_tile(d) for d in data]
 
     # 拼接好友头像和名称
     for i, friend_status in enumerate(friends_status_list):
@@ -410,63 +497,63 @@ def draw_friends_status(
     return canvas
 
 
-def get_average_color(image: Image.Image) -> tuple[int, int, int]:
-    """获取图片的平均颜色"""
-    image_np = np.array(image)
-    average_color = image_np.mean(axis=(0, 1)).astype(int)
-    return tuple(average_color)
-
-
-def split_image(
-    image: Image.Image, rows: int, cols: int
-) -> tuple[list[Image.Image], int, int]:
-    """将图片分割为rows * cols份"""
-    width, height = image.size
+def get_block_average_colors(pixels: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """将图片分割为 rows * cols 块，一次性计算每块的平均颜色"""
+    height, width, channels = pixels.shape
     piece_width = width // cols
     piece_height = height // rows
-    pieces = []
-
-    for r in range(rows):
-        for c in range(cols):
-            box = (
-                c * piece_width,
-                r * piece_height,
-                (c + 1) * piece_width,
-                (r + 1) * piece_height,
-            )
-            piece = image.crop(box)
-            pieces.append(piece)
 
-    return pieces, piece_width, piece_height
+    # 先沿连续的行方向求和，再在每行内按块求和，比直接对 (1, 3) 轴求和快得多
+    row_sums = (
+        pixels[: rows * piece_height, : cols * piece_width]
+        .reshape(rows, piece_height, cols * piece_width * channels)
+        .sum(axis=1, dtype=np.uint32)
+    )
+    block_sums = row_sums.reshape(rows, cols, piece_width, channels).sum(axis=2)
+    return block_sums // (piece_width * piece_height)
 
 
 def recolor_image(image: Image.Image, rows: int, cols: int) -> Image.Image:
     """分片图片，提取平均颜色后拼接"""
-    total_average_color = get_average_color(image)  # 获取整体平均颜色
-    pieces, piece_width, piece_height = split_image(image, rows, cols)
-
-    diameter = min(pieces[0].size)  # 以最小边为直径
-    radius = diameter // 2
-    new_image = Image.new("RGB", image.size, total_average_color)
+    pixels = np.asarray(image.convert("RGB"))
+    height, width, _ = pixels.shape
+    piece_width = width // cols
+    piece_height = height // rows
 
-    for i, piece in enumerate(pieces):
-        average_color = get_average_color(piece)  # 获取每片的平均颜色
+    # 获取整体平均颜色
+    total_average_color = get_block_average_colors(pixels, 1, 1)[0, 0]
+    # 获取每片的平均颜色
+    average_colors = get_block_average_colors(pixels, rows, cols)
 
-        # 计算放置的位置
-        row, col = divmod(i, cols)
-        x = col * piece_width + piece_width // 2
-        y = row * piece_height + piece_height // 2
+    # 每片的颜色铺满整片
+    colors = Image.fromarray(average_colors.astype(np.uint8), "RGB").resize(
+        (cols * piece_width, rows * piece_height), Image.NEAREST
+    )
 
-        # 画圆
-        circle = Image.new("RGBA", (piece_width, piece_height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(circle)
-        draw.ellipse((0, 0, piece_width, piece_height), fill=average_color)
+    # 每片中的圆形遮罩，以最小边为直径
+    radius = min(piece_width, piece_height) // 2
+    circle = Image.new("L", (piece_width, piece_height), 0)
+    ImageDraw.Draw(circle).ellipse((0, 0, piece_width, piece_height), fill=255)
+    mask = Image.fromarray(np.tile(np.asarray(circle), (rows, cols)), "L")
+
+    # 所有圆一次画到同一张图上，圆心位于每片中心
+    new_image = Image.new("RGB", image.size, tuple(total_average_color.tolist()))
+    new_image.paste(
+        colors,
+        (piece_width // 2 - radius, piece_height // 2 - radius),
+        mask,
+    )
 
-        # 将圆形图片粘贴到新图片上
-        new_image.paste(circle, (x - radius, y - radius), circle)
+    # 马赛克经过大半径模糊后几乎没有细节，先缩小再模糊，最后放大回原尺寸
+    factor = max(1, min(background_reduce_factor, piece_width, piece_height))
+    if factor > 1:
+        new_image = new_image.reduce(factor)
 
     new_image = new_image.filter(ImageFilter.SMOOTH)
-    new_image = new_image.filter(ImageFilter.GaussianBlur(50))
+    new_image = new_image.filter(ImageFilter.GaussianBlur(50 / factor))
+
+    if factor > 1:
+        new_image = new_image.resize(image.size, Image.BILINEAR)
 
     return new_image
 
@@ -591,12 +678,12 @@ def draw_game_info(
     draw.text(
         (260, 10),
         game_name,
-        font=ImageFont.truetype(font_regular_path, 26),
+        font=get_font(font_regular_path, 26),
         fill=(255, 255, 255),
     )
 
     # 画最后游玩时间
-    font = ImageFont.truetype(font_light_path, 22)
+    font = get_font(font_light_path, 22)
     display_text = last_play_time
     draw.text(
         (int(bg.width - font.getlength(display_text)) - 10, 75),
@@ -606,7 +693,7 @@ def draw_game_info(
     )
 
     # 画游戏时间
-    font = ImageFont.truetype(font_light_path, 22)
+    font = get_font(font_light_path, 22)
     display_text = f"总时数 {game_time}"
     draw.text(
         (int(bg.width - font.getlength(display_text)) - 10, 50),
@@ -623,7 +710,7 @@ def draw_game_info(
     draw_achievement = ImageDraw.Draw(achievement_bg)
 
     # 画成就进度
-    font = ImageFont.truetype(font_light_path, 18)
+    font = get_font(font_light_path, 18)
     x = 14
     draw_achievement.text(
         (x, 20),
@@ -655,7 +742,7 @@ def draw_game_info(
         x += 48 + 10
 
     if completed_achievement_number > 6:
-        font = ImageFont.truetype(font_regular_path, 22)
+        font = get_font(font_regular_path, 22)
         display_text = f"+{completed_achievement_number - 5}"
         draw_achievement.rectangle((x, 8, x + 48, 56), fill=(34, 34, 34))
         draw_achievement.text(
@@ -699,7 +786,8 @@ def draw_player_status(
     enhancer = ImageEnhance.Brightness(bg)
     bg = enhancer.enhance(0.7)
     # bg.size = (960, 1020)
-    player_avatar = player_avatar.resize((200, 200))
+    if player_avatar.size != (PROFILE_AVATAR_SIZE, PROFILE_AVATAR_SIZE):
+        player_avatar = player_avatar.resize((PROFILE_AVATAR_SIZE, PROFILE_AVATAR_SIZE))
     bg.paste(player_avatar, (40, 40))
 
     draw = ImageDraw.Draw(bg)
@@ -711,7 +799,7 @@ def draw_player_status(
     draw.text(
         (280, 48),
         player_name,
-        font=ImageFont.truetype(font_light_path, 40),
+        font=get_font(font_light_path, 40),
         fill=(255, 255, 255),
     )
 
@@ -719,22 +807,23 @@ def draw_player_status(
     draw.text(
         (280, 100),
         f"好友代码: {player_id}",
-        font=ImageFont.truetype(font_regular_path, 19),
+        font=get_font(font_regular_path, 19),
         fill=(191, 191, 191),
     )
 
     # 画简介
+    font = get_font(font_light_path, 22)
     line_width = 0
     offset = 0
     line = ""
     for idx, char in enumerate(player_description):
         line += char
-        line_width += ImageFont.truetype(font_light_path, 22).getlength(char)
+        line_width += font.getlength(char)
         if line_width > 640 or idx == len(player_description) - 1 or char == "\n":
             draw.text(
                 (280, 132 + offset),
                 line,
-                font=ImageFont.truetype(font_light_path, 22),
+                font=font,
                 fill=(255, 255, 255),
             )
             line = ""
@@ -806,17 +895,15 @@ def draw_player_status(
     draw.text(
         (34, 279),
         "最新动态",
-        font=ImageFont.truetype(font_light_path, 26),
+        font=get_font(font_light_path, 26),
         fill=(255, 255, 255),
     )
     if player_last_two_weeks_time is not None:
-        width = ImageFont.truetype(font_light_path, 26).getlength(
-            player_last_two_weeks_time
-        )
+        width = get_font(font_light_path, 26).getlength(player_last_two_weeks_time)
         draw.text(
             (960 - width - 34, 279),
             player_last_two_weeks_time,
-            font=ImageFont.truetype(font_light_path, 26),
+            font=get_font(font_light_path, 26),
             fill=(255, 255, 255),
         )
 
@@ -834,6 +921,32 @@ def draw_player_status(
     return player_bg
 
 
+def draw_player_card(player_data: PlayerData, steam_friend_code: str) -> Image.Image:
+    """根据 get_user_data 的结果绘制个人主页"""
+    draw_data = [
+        {
+            "game_header": game["game_image"],
+            "game_name": game["game_name"],
+            "game_time": f"{game['play_time']} 小时",
+            "last_play_time": game["last_played"],
+            "achievements": game["achievements"],
+            "completed_achievement_number": game.get("completed_achievement_number"),
+            "total_achievement_number": game.get("total_achievement_number"),
+        }
+        for game in player_data["game_data"]
+    ]
+
+    return draw_player_status(
+        player_data["background"],
+        player_data["avatar"],
+        player_data["player_name"],
+        steam_friend_code,
+        player_data["description"],
+        player_data["recent_2_week_play_time"],
+        draw_data,
+    )
+
+
 def rounded_rectangle(
     image: Image.Image,
     radius: int,
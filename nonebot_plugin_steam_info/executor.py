@@ -0,0 +1,157 @@
+import asyncio
+import functools
+import multiprocessing
+from nonebot.log import logger
+from typing import Any, Callable, Dict, Optional, Tuple
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class TrackedExecutor:
+    """记录队列深度的执行器"""
+
+    def __init__(self, name: str, executor: Executor, workers: int) -> None:
+        self.name = name
+        self.executor = executor
+        self.workers = workers
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await loop.run_in_executor(
+                self.executor, functools.partial(func, *args, **kwargs)
+            )
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        """提交任务，不等待结果"""
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future) -> None:
+        self.in_flight -= 1
+        self.completed += 1
+        if future.exception() is not None:
+            logger.error(f"{self.name} 任务执行失败: {future.exception()}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - self.workers),
+            "max_in_flight": self.max_in_flight,
+            "completed": self.completed,
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+_executors: Dict[str, TrackedExecutor] = {}
+
+
+def _init_render_worker(font_paths: Tuple[str, str, str]) -> None:
+    from . import draw
+
+    draw.set_font_paths(*font_paths)
+
+
+def create_process_pool(workers: int) -> Optional[ProcessPoolExecutor]:
+    """创建用于绘图的进程池并立即启动全部子进程，不支持 fork 的平台返回 None
+
+    需要在启动其他线程与事件循环之前调用，在多线程进程中 fork 可能导致子进程死锁
+    """
+    from . import draw
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_render_worker,
+        initargs=((draw.font_regular_path, draw.font_light_path, draw.font_bold_path),),
+    )
+    # 进程池默认在第一次提交任务时才 fork，此时会先 fork 出全部子进程再启动管理线程，
+    # 之后不会再 fork。等待空任务完成，使管理线程回到空闲状态后再继续
+    pool.submit(int).result()
+    return pool
+
+
+def _create_render_executor(
+    executor_type: str, workers: Optional[int]
+) -> TrackedExecutor:
+    workers = workers or min(4, multiprocessing.cpu_count())
+
+    if executor_type == "process":
+        executor = create_process_pool(workers)
+        if executor is not None:
+            return TrackedExecutor("render", executor, workers)
+        logger.warning("当前平台不支持 fork，绘图将使用线程池")
+    elif executor_type != "thread":
+        logger.error(f"未知的执行器类型: {executor_type}，绘图将使用线程池")
+
+    executor = ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="steam_info_render"
+    )
+    return TrackedExecutor("render", executor, workers)
+
+
+def init_executors(
+    render_type: str = "thread",
+    render_workers: Optional[int] = None,
+    io_workers: int = 4,
+) -> None:
+    shutdown_executors()
+    _executors["render"] = _create_render_executor(render_type, render_workers)
+    _executors["io"] = TrackedExecutor(
+        "io",
+        ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="steam_info_io"),
+        io_workers,
+    )
+    # 单线程顺序写入，保证同一文件的写入顺序
+    _executors["write"] = TrackedExecutor(
+        "write",
+        ThreadPoolExecutor(max_workers=1, thread_name_prefix="steam_info_write"),
+        1,
+    )
+
+
+def _get(name: str) -> TrackedExecutor:
+    if name not in _executors:
+        init_executors()
+    return _executors[name]
+
+
+async def run_render(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """在绘图执行器中执行 CPU 密集的绘图任务"""
+    return await _get("render").run(func, *args, **kwargs)
+
+
+async def run_io(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """在 IO 线程池中执行阻塞的磁盘操作"""
+    return await _get("io").run(func, *args, **kwargs)
+
+
+def submit_write(func: Callable[..., Any], *args: Any) -> Future:
+    """按提交顺序在后台写入，不等待结果"""
+    return _get("write").submit(func, *args)
+
+
+def get_executor_stats() -> Dict[str, Dict[str, int]]:
+    return {name: executor.stats() for name, executor in _executors.items()}
+
+
+def shutdown_executors() -> None:
+    for executor in _executors.values():
+        executor.shutdown()
+    _executors.clear()
@@ -0,0 +1,183 @@
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple, TypedDict
+
+
+class RecentGame(TypedDict):
+    game_name: str
+    game_image_url: Optional[str]
+    details: str
+    achievements: List[Tuple[str, str]]  # (name, image_url)
+    achievement_summary: Optional[str]
+
+
+class Profile(TypedDict):
+    player_name: Optional[str]
+    description: Optional[str]
+    background_url: Optional[str]
+    avatar_url: Optional[str]
+    recent_2_week_play_time: Optional[str]
+    recent_games: List[RecentGame]
+
+
+BACKGROUND_PATTERN = re.compile(r"background-image: url\( '(.*?)' \)")
+
+
+class ProfileParser(HTMLParser):
+    """逐块解析 Steam 个人主页，最近游戏部分结束后 done 为 True，之后的内容无需再读取"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.done = False
+        self.profile: Profile = {
+            "player_name": None,
+            "description": None,
+            "background_url": None,
+            "avatar_url": None,
+            "recent_2_week_play_time": None,
+            "recent_games": [],
+        }
+        # 当前所在的 div / span，元素为对应的标签名
+        self._stack: List[Optional[str]] = []
+        # 正在收集文本的标签名: 文本片段
+        self._texts: Dict[str, List[str]] = {}
+        self._in_title = False
+        self._title: List[str] = []
+        self._game: Optional[RecentGame] = None
+        self._achievement: Optional[str] = None
+
+    def _label(self, tag: str, classes: List[str]) -> Optional[str]:
+        labels = set(self._stack)
+        if tag == "span":
+            if "game_info_achievement_summary" in classes:
+                return "achievement_summary"
+            if "ellipsis" in classes and "achievement_summary" in labels:
+                return "ellipsis"
+            return None
+
+        if "profile_summary" in classes and self.profile["description"] is None:
+            return "summary"
+        if "recentgame_recentplaytime" in classes:
+            return "play_time"
+        if "recent_games" in classes:
+            return "recent_games"
+        if "recent_game" in classes:
+            return "recent_game"
+        if "recent_game" in labels:
+            if "game_name" in classes:
+                return "game_name"
+            if "game_info_details" in classes:
+                return "details"
+            if "game_info_achievement" in classes and "plus_more" not in classes:
+                return "achievement"
+        return None
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self.done:
+            return
+
+        attributes = dict(attrs)
+
+        if tag == "title":
+            self._in_title = True
+        elif tag == "link" and attributes.get("rel") == "image_src":
+            if self.profile["avatar_url"] is None:
+                self.profile["avatar_url"] = attributes.get("href")
+        elif tag == "br" and "summary" in self._texts:
+            self._texts["summary"].append("\n")
+        elif tag == "img" and self._game is not None:
+            classes = (attributes.get("class") or "").split()
+            if "game_capsule" in classes and self._game["game_image_url"] is None:
+                self._game["game_image_url"] = attributes.get("src")
+            elif self._achievement is not None:
+                self._game["achievements"].append(
+                    (self._achievement, attributes.get("src"))
+                )
+                self._achievement = None
+
+        style = attributes.get("style")
+        if style and self.profile["background_url"] is None:
+            background_url = BACKGROUND_PATTERN.search(style)
+            if background_url:
+                self.profile["background_url"] = background_url.group(1)
+
+        if tag not in ("div", "span"):
+            return
+
+        label = self._label(tag, (attributes.get("class") or "").split())
+        self._stack.append(label)
+        if label is None:
+            return
+
+        if label == "recent_game":
+            self._game = {
+                "game_name": "",
+                "game_image_url": None,
+                "details": "",
+                "achievements": [],
+                "achievement_summary": None,
+            }
+        elif label == "achievement":
+            self._achievement = attributes.get("data-tooltip-text")
+        elif label != "recent_games":
+            self._texts[label] = []
+
+    def handle_endtag(self, tag: str) -> None:
+        if self.done:
+            return
+
+        if tag == "title":
+            self._in_title = False
+        if tag not in ("div", "span") or not self._stack:
+            return
+
+        label = self._stack.pop()
+        if label is None:
+            return
+
+        if label == "recent_games":
+            self.done = True
+        elif label == "recent_game":
+            self.profile["recent_games"].append(self._game)
+            self._game = None
+        elif label == "achievement":
+            self._achievement = None
+        elif label in self._texts:
+            self._finish_text(label, "".join(self._texts.pop(label)))
+
+    def _finish_text(self, label: str, text: str) -> None:
+        if label == "summary":
+            self.profile["description"] = text
+        elif label == "play_time":
+            self.profile["recent_2_week_play_time"] = text.strip()
+        elif self._game is None:
+            return
+        elif label == "game_name":
+            self._game["game_name"] = text.strip()
+        elif label == "details":
+            self._game["details"] = text.strip()
+        elif label == "ellipsis":
+            self._game["achievement_summary"] = text
+
+    def handle_data(self, data: str) -> None:
+        if self.done:
+            return
+
+        if self._in_title:
+            self._title.append(data)
+        for texts in self._texts.values():
+            texts.append(data)
+
+    def close(self) -> None:
+        super().close()
+        title = re.search(r"Steam 社区 :: (.*)", "".join(self._title))
+        if title:
+            self.profile["player_name"] = title.group(1)
+
+
+def parse_profile(html: str) -> Profile:
+    """解析完整的个人主页 HTML"""
+    parser = ProfileParser()
+    parser.feed(html)
+    parser.close()
+    return parser.profile
@@ -0,0 +1,161 @@
+import time
+import random
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from .data_source import ApiKeyUsageData
+
+
+class TokenBucket:
+    """令牌桶，按 rate 每秒补充令牌，最多积攒 capacity 个"""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ApiKeyState:
+    def __init__(self, key: str, daily_limit: int, rate: float, burst: int) -> None:
+        self.key = key
+        self.daily_limit = daily_limit
+        self.bucket = TokenBucket(rate, burst)
+        self.day = self._today()
+        self.calls_today = 0
+        self.total_calls = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.consecutive_failures = 0
+        self.backoff_until = 0.0
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    @property
+    def remaining(self) -> int:
+        if self.day != self._today():
+            self.day = self._today()
+            self.calls_today = 0
+        return max(0, self.daily_limit - self.calls_today)
+
+    @property
+    def backoff_remaining(self) -> float:
+        return max(0.0, self.backoff_until - time.monotonic())
+
+
+class ApiKeyPool:
+    """管理多个 Steam API Key 的限流、配额与退避"""
+
+    def __init__(
+        self,
+        keys: List[str],
+        daily_limit: int = 100000,
+        rate: float = 1.0,
+        burst: int = 10,
+        max_backoff: float = 300.0,
+        max_wait: float = 10.0,
+        usage: Optional[ApiKeyUsageData] = None,
+    ) -> None:
+        self.states = [ApiKeyState(key, daily_limit, rate, burst) for key in keys]
+        self.max_backoff = max_backoff
+        self.max_wait = max_wait
+        self._by_key = {state.key: state for state in self.states}
+        self._usage = usage
+
+        if usage is not None:
+            # 恢复重启前当天的调用次数
+            for state in self.states:
+                state.calls_today = usage.get(state.key, state.day)
+
+    def _choose(self, exclude: Set[str]) -> Optional[ApiKeyState]:
+        candidates = [
+            state
+            for state in self.states
+            if state.key not in exclude and state.remaining > 0
+        ]
+        if not candidates:
+            return None
+
+        ready = [state for state in candidates if state.backoff_remaining == 0]
+        if not ready:
+            # 全部处于退避中，等待最快恢复的 Key
+            state = min(candidates, key=lambda state: state.backoff_remaining)
+            if state.backoff_remaining > self.max_wait:
+                return None
+            return state
+
+        # 按剩余配额加权选择
+        return random.choices(ready, weights=[state.remaining for state in ready])[0]
+
+    async def acquire(self, exclude: Optional[Set[str]] = None) -> Optional[str]:
+        """选择一个可用的 API Key 并占用一次调用，无可用 Key 时返回 None"""
+        state = self._choose(exclude or set())
+        if state is None:
+            return None
+
+        if state.backoff_remaining > 0:
+            await asyncio.sleep(state.backoff_remaining)
+        await state.bucket.acquire()
+
+        state.calls_today += 1
+        state.total_calls += 1
+        if self._usage is not None:
+            self._usage.set(state.key, state.day, state.calls_today)
+            self._usage.save()
+        return state.key
+
+    def report(
+        self, key: str, status_code: Optional[int], retry_after: Optional[str] = None
+    ) -> None:
+        """记录一次调用结果，429 或 5xx 时进行带抖动的指数退避"""
+        state = self._by_key[key]
+
+        if status_code is not None and status_code < 400:
+            state.consecutive_failures = 0
+            return
+
+        state.failures += 1
+        if status_code == 429:
+            state.rate_limited += 1
+        elif status_code is not None and status_code < 500:
+            # 其他 4xx 多为 Key 本身的问题，不退避
+            return
+
+        state.consecutive_failures += 1
+        backoff = min(self.max_backoff, 2**state.consecutive_failures)
+        backoff = random.uniform(backoff / 2, backoff)
+        if retry_after is not None and retry_after.isdigit():
+            backoff = max(backoff, int(retry_after))
+        state.backoff_until = time.monotonic() + backoff
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "key": f"{state.key[:4]}****",
+                "calls_today": state.daily_limit - state.remaining,
+                "daily_limit": state.daily_limit,
+                "total_calls": state.total_calls,
+                "failures": state.failures,
+                "rate_limited": state.rate_limited,
+                "backoff": state.backoff_remaining,
+            }
+            for state in self.states
+        ]
@@ -0,0 +1,55 @@
+import pickle
+from nonebot.log import logger
+from typing import Any, Dict, Optional
+
+from .models import PlayerData
+from .draw import draw_to_bytes, draw_player_card
+from .executor import TrackedExecutor, create_process_pool
+
+
+class RenderBusyError(Exception):
+    """渲染队列已满"""
+
+
+def render_player_card(player_data: bytes, steam_friend_code: str) -> bytes:
+    """在渲染进程中绘制个人主页，输入输出均为 bytes 以减少进程间传输"""
+    return draw_to_bytes(
+        draw_player_card,
+        pickle.loads(player_data),
+        steam_friend_code,
+        card_type="profile",
+    )
+
+
+class RenderFarm:
+    """个人主页渲染进程池，队列满时拒绝新任务"""
+
+    def __init__(self, executor: TrackedExecutor, max_queue: int) -> None:
+        self._executor = executor
+        self.max_queue = max_queue
+        self.rejected = 0
+
+    @classmethod
+    def create(cls, workers: int, max_queue: int) -> Optional["RenderFarm"]:
+        pool = create_process_pool(workers)
+        if pool is None:
+            logger.warning("当前平台不支持 fork，无法启用渲染进程池")
+            return None
+        return cls(TrackedExecutor("render_farm", pool, workers), max_queue)
+
+    async def render_player_card(
+        self, player_data: PlayerData, steam_friend_code: str
+    ) -> bytes:
+        if self._executor.stats()["queued"] >= self.max_queue:
+            self.rejected += 1
+            raise RenderBusyError
+
+        return await self._executor.run(
+            render_player_card, pickle.dumps(player_data), steam_friend_code
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._executor.stats(), "rejected": self.rejected}
+
+    def shutdown(self) -> None:
+        self._executor.shutdown()
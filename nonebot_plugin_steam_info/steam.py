@@ -1,12 +1,19 @@
 import re
+import json
+import time
 import httpx
-from pathlib import Path
-from bs4 import BeautifulSoup
+import asyncio
 from nonebot.log import logger
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 
-from .models import PlayerSummaries, PlayerData
+from .cache import DiskCache
+from .assets import get_bytes
+from .client import get_client
+from .executor import run_io
+from .ratelimit import ApiKeyPool
+from .profile_parser import Profile, ProfileParser
+from .models import Player, PlayerSummaries, PlayerData
 
 
 STEAM_ID_OFFSET = 76561197960265728
@@ -24,177 +31,319 @@ def get_steam_id(steam_id_or_steam_friends_code: str) -> str:
     return steam_id_or_steam_friends_code
 
 
+async def _get_players_batch(
+    steam_ids: List[str], key_pool: ApiKeyPool
+) -> Optional[List[Player]]:
+    client = get_client()
+    tried = set()
+
+    while (api_key := await key_pool.acquire(exclude=tried)) is not None:
+        tried.add(api_key)
+        try:
+            response = await client.get(
+                f'http://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/?key={api_key}&steamids={",".join(steam_ids)}'
+            )
+        except httpx.RequestError as exc:
+            key_pool.report(api_key, None)
+            logger.warning(f"API key {api_key[:4]}**** encountered an error: {exc}")
+            continue
+
+        if response.status_code != 200:
+            key_pool.report(
+                api_key, response.status_code, response.headers.get("Retry-After")
+            )
+            logger.warning(
+                f"API key {api_key[:4]}**** failed to get steam users info: {response.status_code}"
+            )
+            continue
+
+        try:
+            players = response.json()["response"]["players"]
+        except (ValueError, KeyError, TypeError) as exc:
+            # 返回 200 但内容不是预期的 JSON，按请求失败处理并换一个 Key
+            key_pool.report(api_key, None)
+            logger.warning(
+                f"API key {api_key[:4]}**** got an invalid response: {exc!r}"
+            )
+            continue
+
+        key_pool.report(api_key, response.status_code)
+        return players
+
+    return None
+
+
 async def get_steam_users_info(
-    steam_ids: List[str], steam_api_key: List[str], proxy: str = None
+    steam_ids: List[str], key_pool: ApiKeyPool, concurrency: int = 4
 ) -> PlayerSummaries:
     if len(steam_ids) == 0:
         return {"response": {"players": []}}
 
-    if len(steam_ids) > 100:
-        # 分批获取
-        result = {"response": {"players": []}}
-        for i in range(0, len(steam_ids), 100):
-            batch_result = await get_steam_users_info(
-                steam_ids[i : i + 100], steam_api_key, proxy
-            )
-            result["response"]["players"].extend(batch_result["response"]["players"])
-        return result
+    # 每批最多 100 个，并发获取
+    batches = [steam_ids[i : i + 100] for i in range(0, len(steam_ids), 100)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_batch(batch: List[str]) -> Optional[List[Player]]:
+        async with semaphore:
+            return await _get_players_batch(batch, key_pool)
+
+    # 单批出错不影响其他批
+    results = await asyncio.gather(
+        *(fetch_batch(batch) for batch in batches), return_exceptions=True
+    )
+
+    players = []
+    failed = 0
+    for batch_players in results:
+        if isinstance(batch_players, Exception):
+            logger.error(f"获取 Steam 用户信息时出错: {batch_players!r}")
+            failed += 1
+        elif batch_players is None:
+            failed += 1
+        else:
+            players.extend(batch_players)
+
+    if failed == len(batches):
+        logger.error("All API keys failed to get steam users info.")
+    elif failed > 0:
+        logger.warning(f"{failed}/{len(batches)} 批 Steam 用户信息获取失败")
+
+    return {"response": {"players": players}}
 
-    for api_key in steam_api_key:
-        try:
-            async with httpx.AsyncClient(proxy=proxy) as client:
-                response = await client.get(
-                    f'http://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/?key={api_key}&steamids={",".join(steam_ids)}'
-                )
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.warning(f"API key {api_key} failed to get steam users info.")
-        except httpx.RequestError as exc:
-            logger.warning(f"API key {api_key} encountered an error: {exc}")
 
-    logger.error("All API keys failed to get steam users info.")
-    return {"response": {"players": []}}
+def _read_cached_asset(
+    disk_cache: DiskCache, cache_key: str
+) -> Tuple[Optional[bytes], Optional[Dict[str, Any]]]:
+    data = disk_cache.get(cache_key)
+    if data is None:
+        return None, None
+    meta = disk_cache.get(f"{cache_key}.meta")
+    return data, json.loads(meta) if meta is not None else None
+
+
+def _write_cached_asset(
+    disk_cache: DiskCache,
+    cache_key: str,
+    data: Optional[bytes],
+    meta: Dict[str, Any],
+) -> None:
+    if data is not None:
+        disk_cache.put(cache_key, data)
+    disk_cache.put(f"{cache_key}.meta", json.dumps(meta).encode("utf-8"))
 
 
 async def _fetch(
-    url: str, default: bytes, cache_file: Optional[Path] = None, proxy: str = None
+    url: str,
+    default: bytes,
+    disk_cache: Optional[DiskCache] = None,
+    cache_key: Optional[str] = None,
+    revalidate_interval: float = 86400.0,
 ) -> bytes:
-    if cache_file is not None and cache_file.exists():
-        return cache_file.read_bytes()
+    """下载资源，有缓存时超过 revalidate_interval 才用 ETag / Last-Modified 重新验证"""
+    cached, meta = None, None
+    if disk_cache is not None and cache_key is not None:
+        cached, meta = await run_io(_read_cached_asset, disk_cache, cache_key)
+
+    headers = {}
+    # url 变化 (如封面的 ?t= 版本号) 或没有元数据时视为新资源
+    if cached is not None and meta is not None and meta["url"] == url:
+        if time.time() - meta["fetched_at"] < revalidate_interval:
+            return cached
+        if meta["etag"] is not None:
+            headers["If-None-Match"] = meta["etag"]
+        if meta["last_modified"] is not None:
+            headers["If-Modified-Since"] = meta["last_modified"]
+
     try:
-        async with httpx.AsyncClient(proxy=proxy) as client:
-            response = await client.get(url)
-            if response.status_code == 200:
-                if cache_file is not None:
-                    cache_file.write_bytes(response.content)
-                return response.content
-            else:
-                response.raise_for_status()
+        response = await get_client().get(url, headers=headers)
+        if response.status_code == 304 and headers:
+            meta["fetched_at"] = time.time()
+            await run_io(_write_cached_asset, disk_cache, cache_key, None, meta)
+            return cached
+        response.raise_for_status()
+        if response.status_code != 200:
+            raise httpx.HTTPError(f"Unexpected status code {response.status_code}")
     except Exception as exc:
         logger.error(f"Failed to get image: {exc}")
-        return default
+        return cached if cached is not None else default
+
+    if disk_cache is not None and cache_key is not None:
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+        await run_io(_write_cached_asset, disk_cache, cache_key, response.content, meta)
+    return response.content
+
+
+async def _fetch_profile(url: str, headers: Dict[str, str]) -> Profile:
+    """边下载边解析个人主页，最近游戏部分结束后停止读取"""
+    client = get_client()
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 302:
+            url = response.headers["Location"]
+        else:
+            response.raise_for_status()
+            return await _parse_stream(response)
+
+    async with client.stream("GET", url, headers=headers) as response:
+        response.raise_for_status()
+        return await _parse_stream(response)
+
+
+async def _parse_stream(response: httpx.Response) -> Profile:
+    parser = ProfileParser()
+    async for chunk in response.aiter_text():
+        parser.feed(chunk)
+        if parser.done:
+            break
+    parser.close()
+    return parser.profile
+
+
+async def _fetch_all(
+    requests: List[Tuple[str, bytes, Optional[str]]],
+    disk_cache: Optional[DiskCache],
+    concurrency: int,
+    timeout: float,
+    revalidate_interval: float,
+) -> List[bytes]:
+    """并发下载多个资源，超过 timeout 仍未完成的使用默认图片"""
+    if not requests:
+        return []
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(url: str, default: bytes, cache_key: Optional[str]) -> bytes:
+        async with semaphore:
+            return await _fetch(
+                url, default, disk_cache, cache_key, revalidate_interval
+            )
 
+    tasks = [asyncio.ensure_future(fetch(*request)) for request in requests]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        logger.warning(f"{len(pending)}/{len(tasks)} 个资源下载超时，将使用默认图片")
 
-async def get_user_data(
-    steam_id: int, cache_path: Path, proxy: str = None
-) -> PlayerData:
-    url = f"https://steamcommunity.com/profiles/{steam_id}"
-    default_background = (Path(__file__).parent / "res/bg_dots.png").read_bytes()
-    default_avatar = (Path(__file__).parent / "res/unknown_avatar.jpg").read_bytes()
-    default_achievement_image = (
-        Path(__file__).parent / "res/default_achievement_image.png"
-    ).read_bytes()
-    default_header_image = (
-        Path(__file__).parent / "res/default_header_image.jpg"
-    ).read_bytes()
-
-    result = {
+    return [
+        task.result() if task in done else request[1]
+        for task, request in zip(tasks, requests)
+    ]
+
+
+def get_default_user_data() -> PlayerData:
+    return {
         "description": "No information given.",
-        "background": default_background,
-        "avatar": default_avatar,
+        "background": get_bytes("bg_dots.png"),
+        "avatar": get_bytes("unknown_avatar.jpg"),
         "player_name": "Unknown",
         "recent_2_week_play_time": None,
         "game_data": [],
     }
 
+
+async def get_user_data(
+    steam_id: int,
+    disk_cache: Optional[DiskCache] = None,
+    asset_concurrency: int = 8,
+    asset_timeout: float = 10.0,
+    revalidate_interval: float = 86400.0,
+) -> PlayerData:
+    try:
+        return await fetch_user_data(
+            steam_id, disk_cache, asset_concurrency, asset_timeout, revalidate_interval
+        )
+    except httpx.HTTPError as exc:
+        logger.error(f"Failed to get user data: {exc}")
+        return get_default_user_data()
+
+
+async def fetch_user_data(
+    steam_id: int,
+    disk_cache: Optional[DiskCache] = None,
+    asset_concurrency: int = 8,
+    asset_timeout: float = 10.0,
+    revalidate_interval: float = 86400.0,
+) -> PlayerData:
+    """获取个人主页数据，主页获取失败时抛出 httpx.HTTPError"""
+    url = f"https://steamcommunity.com/profiles/{steam_id}"
+    default_background = get_bytes("bg_dots.png")
+    default_avatar = get_bytes("unknown_avatar.jpg")
+    default_achievement_image = get_bytes("default_achievement_image.png")
+    default_header_image = get_bytes("default_header_image.jpg")
+
+    result = get_default_user_data()
+
     local_time = datetime.now(timezone.utc).astimezone()
     utc_offset_minutes = int(local_time.utcoffset().total_seconds())
     timezone_cookie_value = f"{utc_offset_minutes},0"
 
-    try:
-        async with httpx.AsyncClient(
-            proxy=proxy,
-            headers={
-                "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6"
-            },
-            cookies={"timezoneOffset": timezone_cookie_value},
-        ) as client:
-            response = await client.get(url)
-            if response.status_code == 200:
-                html = response.text
-            elif response.status_code == 302:
-                url = response.headers["Location"]
-                response = await client.get(url)
-                if response.status_code == 200:
-                    html = response.text
-            else:
-                response.raise_for_status()
-    except httpx.RequestError as exc:
-        logger.error(f"Failed to get user data: {exc}")
-        return result
+    headers = {
+        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
+        "Cookie": f"timezoneOffset={timezone_cookie_value}",
+    }
+
+    profile = await _fetch_profile(url, headers)
 
     # player name
-    player_name = re.search(r"<title>Steam 社区 :: (.*?)</title>", html)
-    if player_name:
-        result["player_name"] = player_name.group(1)
+    if profile["player_name"]:
+        result["player_name"] = profile["player_name"]
 
-    # description t<div class="profile_summary">\r\n\t\t\t\t\t\t\t\t風が雨が激しくても<br>思いだすんだ 僕らを照らす光があるよ<br>今日もいっぱい<br>明日もいっぱい 力を出しきってみるよ\t\t\t\t\t\t\t</div>
-    description = re.search(
-        r'<div class="profile_summary">(.*?)</div>', html, re.DOTALL | re.MULTILINE
-    )
-    if description:
-        description = description.group(1)
-        description = re.sub(r"<br>", "\n", description)
-        description = re.sub(r"\t", "", description)
+    # description
+    if profile["description"] is not None:
+        description = re.sub(r"\t", "", profile["description"])
         result["description"] = description.strip()
 
     # remove emoji
     result["description"] = re.sub(r"ː.*?ː", "", result["description"])
 
-    # remove xml
-    result["description"] = re.sub(r"<.*?>", "", result["description"])
+    # 先收集所有资源，最后并发下载
+    # (写入的字典, 键, url, 默认图片, 缓存 key)
+    assets: List[Tuple[Dict[str, Any], str, str, bytes, Optional[str]]] = []
 
     # background
-    background_url = re.search(r"background-image: url\( \'(.*?)\' \)", html)
+    background_url = profile["background_url"]
     if background_url:
-        background_url = background_url.group(1)
-        result["background"] = await _fetch(
-            background_url, default_background, proxy=proxy
-        )
+        assets.append((result, "background", background_url, default_background, None))
 
     # avatar
-    # \t<link rel="image_src" href="https://avatars.akamai.steamstatic.com/3ade30f61c3d2cc0b8c80aaf567b573cd022c405_full.jpg">
-    avatar_url = re.search(r'<link rel="image_src" href="(.*?)"', html)
+    avatar_url = profile["avatar_url"]
     if avatar_url:
-        avatar_url = avatar_url.group(1)
         # https://avatars.akamai.steamstatic.com/3ade30f61c3d2cc0b8c80aaf567b573cd022c405_full.jpg
         avatar_url_split = avatar_url.split("/")
-        avatar_file = cache_path / f"avatar_{avatar_url_split[-1].split('_')[0]}.jpg"
-        result["avatar"] = await _fetch(
-            avatar_url, default_avatar, cache_file=avatar_file, proxy=proxy
-        )
+        avatar_key = f"avatar_{avatar_url_split[-1].split('_')[0]}.jpg"
+        assets.append((result, "avatar", avatar_url, default_avatar, avatar_key))
 
     # recent 2 week play time
-    # \t<div class="recentgame_quicklinks recentgame_recentplaytime">\r\n\t\t\t\t\t\t\t\t\t<div>15.5 小时（过去 2 周）</div>
-    play_time_text = re.search(
-        r'<div class="recentgame_quicklinks recentgame_recentplaytime">\s*<div>(.*?)</div>',
-        html,
-    )
-    if play_time_text:
-        play_time_text = play_time_text.group(1)
-        result["recent_2_week_play_time"] = play_time_text
+    if profile["recent_2_week_play_time"]:
+        result["recent_2_week_play_time"] = profile["recent_2_week_play_time"]
 
     # game data
-    soup = BeautifulSoup(html, "html.parser")
     game_data = []
-    recent_games = soup.find_all("div", class_="recent_game")
 
-    for game in recent_games:
+    for game in profile["recent_games"]:
         game_info = {}
-        game_info["game_name"] = game.find("div", class_="game_name").text.strip()
-        game_info["game_image_url"] = game.find("img", class_="game_capsule")["src"]
+        game_info["game_name"] = game["game_name"]
+        game_info["game_image_url"] = game["game_image_url"]
         game_info_split = game_info["game_image_url"].split("/")
         # https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/1144400/capsule_184x69_schinese.jpg?t=1724440433
 
-        game_info["game_image"] = await _fetch(
-            game_info["game_image_url"],
-            default_header_image,
-            cache_file=cache_path / f"header_{game_info_split[-2]}.jpg",
-            proxy=proxy,
+        game_info["game_image"] = default_header_image
+        assets.append(
+            (
+                game_info,
+                "game_image",
+                game_info["game_image_url"],
+                default_header_image,
+                f"header_{game_info_split[-2]}.jpg",
+            )
         )
 
-        play_time_text = game.find("div", class_="game_info_details").text.strip()
+        play_time_text = game["details"]
         play_time = re.search(r"总时数\s*(.*?)\s*小时", play_time_text)
         if play_time is None:
             game_info["play_time"] = ""
@@ -207,33 +356,28 @@ async def get_user_data(
         else:
             game_info["last_played"] = "当前正在游戏"
         achievements = []
-        achievement_elements = game.find_all("div", class_="game_info_achievement")
-        for achievement in achievement_elements:
-            if "plus_more" in achievement["class"]:
-                continue
+        for name, image_url in game["achievements"]:
             achievement_info = {}
-            achievement_info["name"] = achievement["data-tooltip-text"]
-            achievement_info["image_url"] = achievement.find("img")["src"]
+            achievement_info["name"] = name
+            achievement_info["image_url"] = image_url
             achievement_info_split = achievement_info["image_url"].split("/")
 
-            achievement_info["image"] = await _fetch(
-                achievement_info["image_url"],
-                default_achievement_image,
-                cache_file=cache_path
-                / f"achievement_{achievement_info_split[-2]}_{achievement_info_split[-1]}",
-                proxy=proxy,
+            achievement_info["image"] = default_achievement_image
+            assets.append(
+                (
+                    achievement_info,
+                    "image",
+                    achievement_info["image_url"],
+                    default_achievement_image,
+                    f"achievement_{achievement_info_split[-2]}_{achievement_info_split[-1]}",
+                )
             )
             achievements.append(achievement_info)
         game_info["achievements"] = achievements
-        game_info_achievement_summary = game.find(
-            "span", class_="game_info_achievement_summary"
-        )
-        if game_info_achievement_summary is None:
+        if game["achievement_summary"] is None:
             game_data.append(game_info)
             continue
-        remain_achievement_text = game_info_achievement_summary.find(
-            "span", class_="ellipsis"
-        ).text
+        remain_achievement_text = game["achievement_summary"]
         game_info["completed_achievement_number"] = int(
             remain_achievement_text.split("/")[0].strip()
         )
@@ -245,6 +389,16 @@ async def get_user_data(
 
     result["game_data"] = game_data
 
+    images = await _fetch_all(
+        [(url, default, cache_key) for _, _, url, default, cache_key in assets],
+        disk_cache,
+        asset_concurrency,
+        asset_timeout,
+        revalidate_interval,
+    )
+    for (target, key, *_), image in zip(assets, images):
+        target[key] = image
+
     return result
 
 
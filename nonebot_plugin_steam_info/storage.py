@@ -0,0 +1,129 @@
+import copy
+import json
+import sqlite3
+from pathlib import Path
+from nonebot.log import logger
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class SqliteStore:
+    """SQLite 存储，所有数据库操作都在同一个后台线程中按顺序执行"""
+
+    def __init__(self, db_path: Path) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="steam_info_sqlite"
+        )
+        self._conn: sqlite3.Connection = self.run(self._connect, db_path)
+
+    @staticmethod
+    def _connect(db_path: Path) -> sqlite3.Connection:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        conn.commit()
+        return conn
+
+    def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """在数据库线程中执行并等待结果"""
+        return self._executor.submit(func, *args).result()
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        """在数据库线程中执行，不等待结果"""
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(self._log_exception)
+        return future
+
+    @staticmethod
+    def _log_exception(future: Future) -> None:
+        if future.exception() is not None:
+            logger.error(f"Failed to write steam info database: {future.exception()}")
+
+    def table(self, name: str) -> "KeyValueTable":
+        return KeyValueTable(self, name)
+
+    def close(self) -> None:
+        self._executor.submit(self._conn.close)
+        self._executor.shutdown(wait=True)
+
+
+class KeyValueTable:
+    """以 key -> JSON 的形式保存数据，save 时只写入发生变化的行"""
+
+    def __init__(self, store: SqliteStore, name: str) -> None:
+        self._store = store
+        self._name = name
+        self._saved: Dict[str, Any] = {}
+        self._created = False
+        store.run(self._create)
+
+    def _create(self) -> None:
+        conn = self._store._conn
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._name} (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        conn.commit()
+
+    def _load(self) -> Optional[List[Tuple[str, str]]]:
+        conn = self._store._conn
+        migrated = conn.execute(
+            "SELECT 1 FROM meta WHERE key = ?", (f"{self._name}_created",)
+        ).fetchone()
+        if migrated is None:
+            return None
+        return conn.execute(
+            f"SELECT key, value FROM {self._name} ORDER BY rowid"
+        ).fetchall()
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """读取全部数据，表从未保存过时返回 None"""
+        rows = self._store.run(self._load)
+        if rows is None:
+            return None
+        self._created = True
+        items = {key: json.loads(value) for key, value in rows}
+        self._saved = {key: copy.copy(value) for key, value in items.items()}
+        return items
+
+    def _write(self, upserts: List[Tuple[str, str]], deletes: List[str]) -> None:
+        conn = self._store._conn
+        with conn:
+            conn.executemany(
+                f"INSERT INTO {self._name} (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                upserts,
+            )
+            conn.executemany(
+                f"DELETE FROM {self._name} WHERE key = ?",
+                [(key,) for key in deletes],
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)",
+                (f"{self._name}_created", "1"),
+            )
+
+    def save(self, items: Dict[str, Any]) -> None:
+        """与上次保存的数据比较，只写入新增、修改和删除的行"""
+        changed = [
+            key
+            for key, value in items.items()
+            if key not in self._saved or self._saved[key] != value
+        ]
+        deletes = [key for key in self._saved if key not in items]
+        if not changed and not deletes and self._created:
+            return
+
+        for key in changed:
+            self._saved[key] = copy.copy(items[key])
+        for key in deletes:
+            del self._saved[key]
+        self._created = True
+
+        upserts = [
+            (key, json.dumps(self._saved[key], ensure_ascii=False)) for key in changed
+        ]
+        self._store.submit(self._write, upserts, deletes)
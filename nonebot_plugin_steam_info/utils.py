@@ -1,42 +1,94 @@
 import time
 import pytz
 import httpx
+import asyncio
+import hashlib
 import datetime
 import calendar
 from PIL import Image
 from io import BytesIO
-from pathlib import Path
-from typing import Dict, Optional
+from nonebot.log import logger
+from typing import Dict, List, Optional
 
 from .models import Player
+from .cache import DiskCache, LRUCache
+from .assets import get_image
+from .client import get_client
+from .executor import run_io
 from .data_source import BindData
 
 
-async def _fetch_avatar(avatar_url: str, proxy: str = None) -> Image.Image:
-    async with httpx.AsyncClient(proxy=proxy) as client:
-        response = await client.get(avatar_url)
-        if response.status_code != 200:
-            return Image.open(Path(__file__).parent / "res/unknown_avatar.jpg")
-        return Image.open(BytesIO(response.content))
+# 解码并缩放后的头像，键为 (steamid, avatarhash, 尺寸)
+avatar_cache = LRUCache(
+    16 * 1024 * 1024,
+    lambda image: image.width * image.height * len(image.getbands()),
+)
 
 
-async def fetch_avatar(
-    player: Player, avatar_dir: Optional[Path], proxy: str = None
-) -> Image.Image:
-    if avatar_dir is not None:
-        avatar_path = (
-            avatar_dir / f"avatar_{player['steamid']}_{player['avatarhash']}.png"
-        )
+def _open_avatar(data: bytes) -> Image.Image:
+    avatar = Image.open(BytesIO(data))
+    avatar.load()
+    return avatar
 
-        if avatar_path.exists():
-            avatar = Image.open(avatar_path)
-        else:
-            avatar = await _fetch_avatar(player["avatarfull"], proxy)
 
-            avatar.save(avatar_path)
-    else:
-        avatar = await _fetch_avatar(player["avatarfull"], proxy)
+async def fetch_avatar(player: Player, disk_cache: Optional[DiskCache]) -> Image.Image:
+    # 与个人主页的头像共用缓存
+    cache_key = f"avatar_{player['avatarhash']}.jpg"
+    if disk_cache is not None:
+        data = await run_io(disk_cache.get, cache_key)
+        if data is not None:
+            return await run_io(_open_avatar, data)
+
+    try:
+        response = await get_client().get(player["avatarfull"])
+    except httpx.HTTPError as exc:
+        # 单个头像下载失败时使用默认头像，不影响同时获取的其他头像
+        logger.warning(f"获取 {player['steamid']} 的头像失败: {exc!r}")
+        return get_image("unknown_avatar.jpg")
+    if response.status_code != 200:
+        return get_image("unknown_avatar.jpg")
+
+    if disk_cache is not None:
+        await run_io(disk_cache.put, cache_key, response.content)
+    return await run_io(_open_avatar, response.content)
+
+
+def _resize_avatar(avatar: Image.Image, size: int) -> Image.Image:
+    if avatar.size == (size, size):
+        return avatar
+    return avatar.resize((size, size), Image.BICUBIC)
+
 
+def _decode_avatar(data: bytes, size: int) -> Image.Image:
+    return _resize_avatar(_open_avatar(data), size)
+
+
+async def get_avatar(
+    player: Player, size: int, disk_cache: Optional[DiskCache] = None
+) -> Image.Image:
+    """获取缩放到 size 的头像，同一头像的同一尺寸只解码、缩放一次"""
+    key = (player["steamid"], player["avatarhash"], size)
+    avatar = avatar_cache.get(key)
+    if avatar is not None:
+        return avatar
+
+    avatar = await fetch_avatar(player, disk_cache)
+    if avatar is get_image("unknown_avatar.jpg"):
+        # 下载失败时不缓存默认头像
+        return avatar
+
+    avatar = await run_io(_resize_avatar, avatar, size)
+    avatar_cache.put(key, avatar)
+    return avatar
+
+
+async def get_profile_avatar(steamid: str, data: bytes, size: int) -> Image.Image:
+    """解码并缩放个人主页中的头像，以头像内容的哈希代替 avatarhash"""
+    key = (steamid, hashlib.md5(data).hexdigest(), size)
+    avatar = avatar_cache.get(key)
+    if avatar is None:
+        avatar = await run_io(_decode_avatar, data, size)
+        avatar_cache.put(key, avatar)
     return avatar
 
 
@@ -47,11 +99,8 @@ def convert_player_name_to_nickname(
     return data
 
 
-async def simplize_steam_player_data(
-    player: Player, proxy: str = None, avatar_dir: Path = None
-) -> Dict[str, str]:
-    avatar = await fetch_avatar(player, avatar_dir, proxy)
-
+def get_player_status(player: Player) -> str:
+    """获取好友列表中显示的状态文本"""
     if player["personastate"] == 0:
         if not player.get("lastlogoff"):
             status = "离线"
@@ -85,18 +134,96 @@ async def simplize_steam_player_data(
     else:
         status = "未知"
 
+    return status
+
+
+async def get_avatars(
+    players: List[Player],
+    size: Optional[int] = None,
+    disk_cache: Optional[DiskCache] = None,
+    concurrency: int = 100,
+) -> List[Image.Image]:
+    """并发获取多个玩家的头像，按输入顺序返回，相同 avatarhash 的头像只获取一次"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def load(player: Player) -> Image.Image:
+        async with semaphore:
+            if size is not None:
+                return await get_avatar(player, size, disk_cache)
+            return await fetch_avatar(player, disk_cache)
+
+    # avatarhash: 第一个使用该头像的玩家
+    unique: Dict[str, Player] = {}
+    for player in players:
+        unique.setdefault(player["avatarhash"], player)
+
+    avatars = dict(
+        zip(unique, await asyncio.gather(*(load(p) for p in unique.values())))
+    )
+    return [avatars[player["avatarhash"]] for player in players]
+
+
+def _simplize(player: Player, avatar: Image.Image) -> Dict[str, str]:
+    # avatarhash 对应实际使用的头像，下载失败使用默认头像时为 None，
+    # 以免好友状态行缓存把默认头像记在玩家真实的 avatarhash 下
+    if avatar is get_image("unknown_avatar.jpg"):
+        avatarhash = None
+    else:
+        avatarhash = player["avatarhash"]
+
     return {
         "steamid": player["steamid"],
         "avatar": avatar,
+        "avatarhash": avatarhash,
         "name": player["personaname"],
-        "status": status,
+        "status": get_player_status(player),
         "personastate": player["personastate"],
     }
 
 
-def image_to_bytes(image: Image.Image) -> bytes:
+async def simplize_steam_player_data(
+    player: Player,
+    disk_cache: Optional[DiskCache] = None,
+    avatar_size: Optional[int] = None,
+) -> Dict[str, str]:
+    if avatar_size is not None:
+        avatar = await get_avatar(player, avatar_size, disk_cache)
+    else:
+        avatar = await fetch_avatar(player, disk_cache)
+    return _simplize(player, avatar)
+
+
+async def simplize_steam_players(
+    players: List[Player],
+    disk_cache: Optional[DiskCache] = None,
+    avatar_size: Optional[int] = None,
+    concurrency: int = 100,
+) -> List[Dict[str, str]]:
+    """批量版本的 simplize_steam_player_data，头像并发获取，按输入顺序返回"""
+    avatars = await get_avatars(players, avatar_size, disk_cache, concurrency)
+    return [_simplize(player, avatar) for player, avatar in zip(players, avatars)]
+
+
+IMAGE_FORMATS = ("png", "png8", "jpeg", "webp")
+
+
+def image_to_bytes(
+    image: Image.Image,
+    image_format: str = "png",
+    quality: int = 85,
+    compress_level: int = 6,
+) -> bytes:
+    """编码图片，png8 为 256 色调色板 PNG，quality 只对 jpeg 与 webp 生效"""
     with BytesIO() as bio:
-        image.save(bio, format="PNG")
+        if image_format == "png8":
+            image = image.convert("RGB").quantize(256, Image.Quantize.FASTOCTREE)
+            image.save(bio, format="PNG", compress_level=compress_level)
+        elif image_format == "jpeg":
+            image.convert("RGB").save(bio, format="JPEG", quality=quality)
+        elif image_format == "webp":
+            image.save(bio, format="WEBP", quality=quality)
+        else:
+            image.save(bio, format="PNG", compress_level=compress_level)
         return bio.getvalue()
 
 
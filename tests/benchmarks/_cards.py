@@ -0,0 +1,115 @@
+"""绘图基准测试使用的示例卡片
+
+需要字体文件，默认与插件配置相同，使用运行目录下的 fonts/MiSans-*.ttf，
+也可以用 --font 指定一个字体文件代替全部三种字体
+"""
+
+import argparse
+from io import BytesIO
+from typing import Any, Callable, Dict
+
+import numpy as np
+from PIL import Image
+
+
+def parse_font_args() -> None:
+    """读取命令行中的字体参数并设置字体路径"""
+    from nonebot_plugin_steam_info import draw
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fonts", default="fonts", help="MiSans 字体所在目录")
+    parser.add_argument("--font", help="代替全部三种字体的字体文件")
+    args = parser.parse_args()
+
+    if args.font is not None:
+        draw.set_font_paths(args.font, args.font, args.font)
+    else:
+        draw.set_font_paths(
+            f"{args.fonts}/MiSans-Regular.ttf",
+            f"{args.fonts}/MiSans-Light.ttf",
+            f"{args.fonts}/MiSans-Bold.ttf",
+        )
+    draw.check_font()
+
+
+def random_image(width: int, height: int, seed: int = 0) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    pixels = (rng.random((height // 20 + 1, width // 20 + 1, 3)) * 255).astype(np.uint8)
+    return Image.fromarray(pixels).resize((width, height), Image.BICUBIC)
+
+
+def to_bytes(image: Image.Image) -> bytes:
+    with BytesIO() as bio:
+        image.save(bio, format="PNG")
+        return bio.getvalue()
+
+
+def profile_args() -> tuple:
+    games = [
+        {
+            "game_name": f"Game {i}",
+            "game_time": "10.2 小时（过去 2 周）",
+            "last_play_time": "10 月 2 日",
+            "game_header": to_bytes(random_image(184, 69, i)),
+            "achievements": [
+                {"name": f"Achievement {j}", "image": to_bytes(random_image(64, 64, j))}
+                for j in range(5)
+            ],
+            "completed_achievement_number": 12,
+            "total_achievement_number": 50,
+        }
+        for i in range(3)
+    ]
+    return (
+        random_image(1920, 1080),
+        random_image(184, 184, 1),
+        "Player",
+        "123456789",
+        "这是一段个人简介\nThis is a profile description.\n" * 3,
+        "30.5 小时",
+        games,
+    )
+
+
+def friends_args(count: int = 30) -> tuple:
+    states = [(0, "上次在线 3 天前"), (1, "在线"), (1, "Game"), (3, "离开")]
+    data = []
+    for i in range(count):
+        personastate, status = states[i % len(states)]
+        data.append(
+            {
+                "steamid": str(76561197960265728 + i),
+                "avatar": random_image(64, 64, i),
+                "avatarhash": f"hash{i}",
+                "name": f"Friend {i}",
+                "nickname": None,
+                "status": status,
+                "personastate": personastate,
+            }
+        )
+    return random_image(72, 72, 2), "Group", data
+
+
+def start_gaming_args() -> tuple:
+    return random_image(66, 66, 3), "Friend", "Game", None
+
+
+def sample_cards() -> Dict[str, Callable[[], Any]]:
+    """卡片类型: 绘制函数，与 draw.set_image_encoder 的卡片类型对应"""
+    from nonebot_plugin_steam_info import draw
+
+    profile = profile_args()
+    friends = friends_args()
+    start_gaming = start_gaming_args()
+
+    def draw_friends():
+        # 不使用好友状态行缓存，每次都完整绘制
+        draw.friend_tile_cache.clear()
+        parent_avatar, parent_name, data = friends
+        return draw.draw_friends_status(parent_avatar, parent_name, list(data))
+
+    return {
+        "profile": lambda: draw.draw_player_status(*profile),
+        "friends": draw_friends,
+        "start_gaming": lambda: draw.draw_start_gaming(*start_gaming),
+    }
@@ -0,0 +1,49 @@
+"""基准测试脚本的公共部分
+
+在仓库根目录下运行，例如 ``python tests/benchmarks/bench_storage.py``，
+脚本不会被 pytest 收集
+"""
+
+import sys
+import time
+import tempfile
+import statistics
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+ROOT = Path(__file__).resolve().parents[2]
+FIXTURES = ROOT / "tests" / "fixtures"
+
+
+def init_nonebot() -> None:
+    """导入插件前初始化 NoneBot，数据与缓存放在临时目录中"""
+    sys.path.insert(0, str(ROOT))
+
+    import nonebot
+
+    data_dir = tempfile.mkdtemp(prefix="steam_info_bench_")
+    nonebot.init(
+        steam_api_key="bench",
+        log_level="WARNING",
+        localstore_data_dir=f"{data_dir}/data",
+        localstore_cache_dir=f"{data_dir}/cache",
+        localstore_config_dir=f"{data_dir}/config",
+    )
+
+
+def measure(func: Callable[[], Any], repeat: int = 20) -> Dict[str, float]:
+    """执行 repeat 次 func，返回耗时的中位数与最小值，单位为毫秒"""
+    func()  # 预热
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"median": statistics.median(times), "min": min(times)}
+
+
+def report(name: str, result: Dict[str, float], extra: str = "") -> None:
+    print(
+        f"{name:<40} median {result['median']:9.2f} ms"
+        f"  min {result['min']:9.2f} ms  {extra}"
+    )
@@ -0,0 +1,35 @@
+"""各类卡片在不同编码格式下的编码耗时与大小"""
+
+from _common import report, measure, init_nonebot
+
+init_nonebot()
+
+from _cards import sample_cards, parse_font_args  # noqa: E402
+from nonebot_plugin_steam_info.utils import image_to_bytes  # noqa: E402
+
+ENCODERS = {
+    "png": {"image_format": "png"},
+    "png level 1": {"image_format": "png", "compress_level": 1},
+    "png8": {"image_format": "png8"},
+    "jpeg q85": {"image_format": "jpeg", "quality": 85},
+    "webp q85": {"image_format": "webp", "quality": 85},
+}
+
+
+def main() -> None:
+    parse_font_args()
+
+    for card_type, draw_card in sample_cards().items():
+        image = draw_card()
+        print(f"{card_type} {image.width}x{image.height}")
+        for name, options in ENCODERS.items():
+            size = len(image_to_bytes(image, **options))
+            report(
+                f"  {name}",
+                measure(lambda: image_to_bytes(image, **options), repeat=5),
+                f"{size / 1024:8.1f} KB",
+            )
+
+
+if __name__ == "__main__":
+    main()
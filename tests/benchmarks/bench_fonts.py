@@ -0,0 +1,62 @@
+"""每张卡片绘制时加载字体的次数与耗时
+
+对比使用字体缓存（set_font_paths 时预先加载）与每次 get_font 都重新加载的情况，
+后者相当于旧实现中每次绘制文字都调用 ImageFont.truetype
+"""
+
+import time
+
+from PIL import ImageFont
+
+from _common import report, measure, init_nonebot
+
+init_nonebot()
+
+from _cards import sample_cards, parse_font_args  # noqa: E402
+from nonebot_plugin_steam_info import draw  # noqa: E402
+
+loads = {"count": 0, "time": 0.0}
+truetype = ImageFont.truetype
+
+
+def counting_truetype(*args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return truetype(*args, **kwargs)
+    finally:
+        loads["count"] += 1
+        loads["time"] += time.perf_counter() - start
+
+
+def count_loads(func) -> str:
+    loads.update(count=0, time=0.0)
+    func()
+    return f"{loads['count']} font loads, {loads['time'] * 1000:.2f} ms"
+
+
+def main() -> None:
+    parse_font_args()
+    ImageFont.truetype = counting_truetype
+    cards = sample_cards()
+    get_font = draw.get_font
+
+    for card_type, draw_card in cards.items():
+        draw.get_font = get_font
+        report(
+            f"{card_type} with font cache",
+            measure(draw_card, repeat=5),
+            count_loads(draw_card),
+        )
+
+        draw.get_font = lambda path, size: ImageFont.truetype(path, size)
+        report(
+            f"{card_type} without font cache",
+            measure(draw_card, repeat=5),
+            count_loads(draw_card),
+        )
+
+    draw.get_font = get_font
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""个人主页解析耗时：流式解析与完整文档解析的对比
+
+- streaming: 与 get_user_data 相同，按块输入 ProfileParser，最近游戏部分结束后停止
+- full: 将整个页面输入 ProfileParser
+- bs4: 旧实现的正则 + BeautifulSoup 完整解析，需要安装 beautifulsoup4
+
+除 fixtures 中的页面外，还会在公开主页的留言区后追加留言，
+模拟约 125 KB 的真实页面
+"""
+
+import re
+
+from _common import FIXTURES, report, measure, init_nonebot
+
+init_nonebot()
+
+from nonebot_plugin_steam_info.profile_parser import (  # noqa: E402
+    Profile,
+    ProfileParser,
+    parse_profile,
+)
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+CHUNK_SIZE = 16 * 1024
+LARGE_PAGE_SIZE = 125 * 1024
+
+COMMENT = (
+    '<div class="commentthread_comment responsive_body_text">'
+    '<div class="commentthread_comment_content">'
+    '<div class="commentthread_comment_author">'
+    '<a class="hoverunderline commentthread_author_link" '
+    'href="https://steamcommunity.com/id/someone"><bdi>路人</bdi></a></div>'
+    '<div class="commentthread_comment_text">+rep 一起玩得很开心</div>'
+    "</div></div>\n"
+)
+
+
+def make_large_page(html: str) -> str:
+    count = (LARGE_PAGE_SIZE - len(html)) // len(COMMENT.encode("utf-8"))
+    footer = html.index('<div id="footer">')
+    return html[:footer] + COMMENT * max(count, 0) + html[footer:]
+
+
+def parse_streaming(html: str) -> Profile:
+    parser = ProfileParser()
+    for i in range(0, len(html), CHUNK_SIZE):
+        parser.feed(html[i : i + CHUNK_SIZE])
+        if parser.done:
+            break
+    parser.close()
+    return parser.profile
+
+
+def parse_legacy(html: str) -> None:
+    """旧实现中的提取部分，不含图片下载"""
+    re.search(r"<title>Steam 社区 :: (.*?)</title>", html)
+    re.search(
+        r'<div class="profile_summary">(.*?)</div>', html, re.DOTALL | re.MULTILINE
+    )
+    re.search(r"background-image: url\( \'(.*?)\' \)", html)
+    re.search(r'<link rel="image_src" href="(.*?)"', html)
+    re.search(
+        r'<div class="recentgame_quicklinks recentgame_recentplaytime">\s*<div>(.*?)</div>',
+        html,
+    )
+
+    soup = BeautifulSoup(html, "html.parser")
+    for game in soup.find_all("div", class_="recent_game"):
+        game.find("div", class_="game_name").text.strip()
+        game.find("img", class_="game_capsule")["src"]
+        game.find("div", class_="game_info_details").text.strip()
+        for achievement in game.find_all("div", class_="game_info_achievement"):
+            achievement.get("data-tooltip-text")
+        game.find("span", class_="game_info_achievement_summary")
+
+
+def main() -> None:
+    pages = {
+        path.stem: path.read_text("utf-8")
+        for path in sorted(FIXTURES.glob("profile_*.html"))
+    }
+    pages["profile_public_large"] = make_large_page(pages["profile_public"])
+
+    for name, html in pages.items():
+        # 提前停止不应影响结果
+        assert parse_streaming(html) == parse_profile(html)
+        size = f"{len(html.encode('utf-8')) / 1024:.1f} KB"
+        report(f"{name} streaming", measure(lambda: parse_streaming(html)), size)
+        report(f"{name} full", measure(lambda: parse_profile(html)), size)
+        if BeautifulSoup is not None:
+            report(f"{name} bs4", measure(lambda: parse_legacy(html)), size)
+
+    if BeautifulSoup is None:
+        print("未安装 beautifulsoup4，跳过旧实现的对比")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""recolor_image 的耗时：逐块裁剪的旧实现与 NumPy 分块求平均的对比
+
+背景为 1920x1080 的随机图片，与 draw_player_status 一样截取中间 960 像素宽，
+分为 10x10 块
+"""
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+from _common import report, measure, init_nonebot
+
+init_nonebot()
+
+from nonebot_plugin_steam_info import draw  # noqa: E402
+
+ROWS = COLS = 10
+
+
+def make_background() -> Image.Image:
+    rng = np.random.default_rng(0)
+    pixels = (rng.random((55, 97, 3)) * 255).astype(np.uint8)
+    background = Image.fromarray(pixels).resize((1920, 1080), Image.BICUBIC)
+    return background.crop(
+        ((background.width - 960) // 2, 0, (background.width + 960) // 2, 1080)
+    )
+
+
+def legacy_average_colors(image: Image.Image, rows: int, cols: int):
+    """旧实现：裁剪出每一块后分别求平均"""
+    piece_width = image.width // cols
+    piece_height = image.height // rows
+    colors = []
+    for r in range(rows):
+        for c in range(cols):
+            piece = image.crop(
+                (
+                    c * piece_width,
+                    r * piece_height,
+                    (c + 1) * piece_width,
+                    (r + 1) * piece_height,
+                )
+            )
+            colors.append(tuple(np.array(piece).mean(axis=(0, 1)).astype(int)))
+    return colors, piece_width, piece_height
+
+
+def legacy_mosaic(image: Image.Image, rows: int, cols: int) -> Image.Image:
+    """旧实现的马赛克部分：每块单独画一个圆再逐个粘贴"""
+    total_average_color = tuple(np.array(image).mean(axis=(0, 1)).astype(int))
+    colors, piece_width, piece_height = legacy_average_colors(image, rows, cols)
+
+    radius = min(piece_width, piece_height) // 2
+    new_image = Image.new("RGB", image.size, total_average_color)
+    for i, average_color in enumerate(colors):
+        row, col = divmod(i, cols)
+        x = col * piece_width + piece_width // 2
+        y = row * piece_height + piece_height // 2
+
+        circle = Image.new("RGBA", (piece_width, piece_height), (0, 0, 0, 0))
+        ImageDraw.Draw(circle).ellipse(
+            (0, 0, piece_width, piece_height), fill=average_color
+        )
+        new_image.paste(circle, (x - radius, y - radius), circle)
+    return new_image
+
+
+def legacy_recolor_image(image: Image.Image, rows: int, cols: int) -> Image.Image:
+    new_image = legacy_mosaic(image, rows, cols)
+    new_image = new_image.filter(ImageFilter.SMOOTH)
+    return new_image.filter(ImageFilter.GaussianBlur(50))
+
+
+def main() -> None:
+    background = make_background()
+    pixels = np.asarray(background)
+
+    report(
+        "average colors legacy",
+        measure(lambda: legacy_average_colors(background, ROWS, COLS)),
+    )
+    report(
+        "average colors numpy",
+        measure(lambda: draw.get_block_average_colors(pixels, ROWS, COLS)),
+    )
+    report("mosaic legacy", measure(lambda: legacy_mosaic(background, ROWS, COLS)))
+    # 两种实现的模糊部分相同，recolor_image 减去这部分即为马赛克的耗时
+    mosaic = legacy_mosaic(background, ROWS, COLS)
+    report(
+        "blur only",
+        measure(
+            lambda: mosaic.filter(ImageFilter.SMOOTH).filter(
+                ImageFilter.GaussianBlur(50)
+            ),
+            repeat=5,
+        ),
+    )
+
+    report(
+        "recolor_image legacy",
+        measure(lambda: legacy_recolor_image(background, ROWS, COLS), repeat=5),
+    )
+    for factor in (1, 4):
+        draw.set_background_reduce_factor(factor)
+        report(
+            f"recolor_image reduce factor {factor}",
+            measure(lambda: draw.recolor_image(background, ROWS, COLS), repeat=5),
+        )
+
+    # 原尺寸模糊时与旧实现的结果一致
+    draw.set_background_reduce_factor(1)
+    legacy = np.asarray(legacy_recolor_image(background, ROWS, COLS), dtype=int)
+    current = np.asarray(draw.recolor_image(background, ROWS, COLS), dtype=int)
+    print(f"max diff from legacy: {np.abs(legacy - current).max()}")
+
+
+if __name__ == "__main__":
+    main()
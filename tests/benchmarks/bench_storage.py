@@ -0,0 +1,128 @@
+"""JSON 与 SQLite 存储在 10k 条绑定时的保存耗时
+
+每次修改一条数据后保存，分别统计调用 save 的耗时（在事件循环中执行的部分）
+与等待后台写入完成的耗时
+"""
+
+import json
+import tempfile
+import itertools
+from pathlib import Path
+
+from _common import report, measure, init_nonebot
+
+init_nonebot()
+
+from nonebot_plugin_steam_info.storage import SqliteStore  # noqa: E402
+from nonebot_plugin_steam_info.executor import submit_write  # noqa: E402
+from nonebot_plugin_steam_info.data_source import BindData, SteamInfoData  # noqa: E402
+
+BINDINGS = 10000
+GROUPS = 200
+
+
+def make_bind_data(save_path: Path, store) -> BindData:
+    bind_data = BindData(save_path, store)
+    for i in range(BINDINGS):
+        bind_data.add(
+            f"group{i % GROUPS}",
+            {
+                "user_id": f"user{i}",
+                "steam_id": str(76561197960265728 + i),
+                "nickname": None,
+            },
+        )
+    bind_data.save()
+    return bind_data
+
+
+def make_steam_info_data(save_path: Path, store) -> SteamInfoData:
+    steam_info_data = SteamInfoData(save_path, store)
+    for i in range(BINDINGS):
+        steam_info_data.update(
+            {
+                "steamid": str(76561197960265728 + i),
+                "personaname": f"player{i}",
+                "personastate": 0,
+                "avatarhash": "0" * 40,
+                "lastlogoff": 1700000000,
+                "game_start_time": None,
+            }
+        )
+    steam_info_data.save()
+    return steam_info_data
+
+
+def bench_bind_data(name: str, store, wait) -> None:
+    bind_data = make_bind_data(Path(tempfile.mkdtemp()) / "bind_data.json", store)
+    wait()
+    counter = itertools.count()
+
+    def save():
+        # 修改一个昵称后保存
+        bind_data.get("group0", "user0")["nickname"] = str(next(counter))
+        bind_data.save()
+
+    report(f"bind_data {name} save", measure(save))
+    report(f"bind_data {name} save + write", measure(lambda: (save(), wait())))
+
+
+def bench_steam_info_data(name: str, store, wait) -> None:
+    steam_info_data = make_steam_info_data(
+        Path(tempfile.mkdtemp()) / "steam_info.json", store
+    )
+    wait()
+    counter = itertools.count()
+
+    def save():
+        # 一次轮询中只有一个玩家的状态变化
+        player = steam_info_data.get_player(str(76561197960265728))
+        steam_info_data.update({**player, "personastate": next(counter) % 2})
+        steam_info_data.save()
+
+    report(f"steam_info {name} save", measure(save))
+    report(f"steam_info {name} save + write", measure(lambda: (save(), wait())))
+
+
+def bench_whole_file_rewrite() -> None:
+    """旧实现：每次修改都在事件循环中重写整个 JSON 文件"""
+    bind_data = make_bind_data(Path(tempfile.mkdtemp()) / "bind_data.json", None)
+    submit_write(int).result()
+    path = Path(tempfile.mkdtemp()) / "bind_data.json"
+    report(
+        "bind_data json sync rewrite",
+        measure(
+            lambda: path.write_text(
+                json.dumps(bind_data.content, indent=4), encoding="utf-8"
+            )
+        ),
+    )
+
+
+def main() -> None:
+    print(f"{BINDINGS} bindings in {GROUPS} groups")
+
+    bench_whole_file_rewrite()
+    bench_bind_data("json", None, lambda: submit_write(int).result())
+    bench_steam_info_data("json", None, lambda: submit_write(int).result())
+
+    store = SqliteStore(Path(tempfile.mkdtemp()) / "steam_info.db")
+    bench_bind_data("sqlite", store, lambda: store.run(int))
+    bench_steam_info_data("sqlite", store, lambda: store.run(int))
+    store.close()
+
+    # 从 JSON 迁移 10k 条绑定
+    json_dir = Path(tempfile.mkdtemp())
+    make_bind_data(json_dir / "bind_data.json", None)
+    submit_write(int).result()
+
+    def migrate():
+        store = SqliteStore(Path(tempfile.mkdtemp()) / "steam_info.db")
+        BindData(json_dir / "bind_data.json", store)
+        store.close()
+
+    report("bind_data json -> sqlite migration", measure(migrate, repeat=5))
+
+
+if __name__ == "__main__":
+    main()
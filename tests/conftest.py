@@ -0,0 +1,14 @@
+import tempfile
+
+import nonebot
+
+
+def pytest_configure(config):
+    # 导入插件前需要先初始化 NoneBot
+    data_dir = tempfile.mkdtemp(prefix="steam_info_test_")
+    nonebot.init(
+        steam_api_key="test",
+        localstore_data_dir=f"{data_dir}/data",
+        localstore_cache_dir=f"{data_dir}/cache",
+        localstore_config_dir=f"{data_dir}/config",
+    )
@@ -0,0 +1,44 @@
+import asyncio
+from io import BytesIO
+
+import httpx
+from PIL import Image
+
+from nonebot_plugin_steam_info import client
+from nonebot_plugin_steam_info.assets import get_image
+from nonebot_plugin_steam_info.utils import simplize_steam_players
+
+
+def player(steamid: str) -> dict:
+    return {
+        "steamid": steamid,
+        "avatarhash": f"hash{steamid}",
+        "avatarfull": f"https://avatars.steamstatic.com/{steamid}_full.jpg",
+        "personaname": steamid,
+        "personastate": 1,
+    }
+
+
+def test_avatar_error_falls_back_to_unknown_avatar():
+    with BytesIO() as bio:
+        Image.new("RGB", (184, 184)).save(bio, format="JPEG")
+        avatar = bio.getvalue()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if "bad" in request.url.path:
+            raise httpx.ConnectTimeout("timeout", request=request)
+        return httpx.Response(200, content=avatar)
+
+    async def main():
+        old_client = client._client
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await simplize_steam_players([player("bad"), player("good")])
+        finally:
+            await client._client.aclose()
+            client._client = old_client
+
+    bad, good = asyncio.run(main())
+    assert bad["avatar"] is get_image("unknown_avatar.jpg")
+    assert bad["avatarhash"] is None
+    assert good["avatarhash"] == "hashgood"
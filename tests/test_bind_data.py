@@ -0,0 +1,114 @@
+import pytest
+
+from nonebot_plugin_steam_info.storage import SqliteStore
+from nonebot_plugin_steam_info.executor import submit_write
+from nonebot_plugin_steam_info.data_source import BindData
+
+
+def entry(user_id, steam_id, nickname=None):
+    return {"user_id": user_id, "steam_id": steam_id, "nickname": nickname}
+
+
+def assert_consistent(bind_data: BindData):
+    """索引应与按顺序查找 content 的结果一致"""
+    for parent_id, entries in bind_data.content.items():
+        for data in entries:
+            first = next(d for d in entries if d["user_id"] == data["user_id"])
+            assert bind_data.get(parent_id, data["user_id"]) is first
+            first = next(d for d in entries if d["steam_id"] == data["steam_id"])
+            assert bind_data.get_by_steam_id(parent_id, data["steam_id"]) is first
+
+    expected = {
+        data["steam_id"]: {
+            parent_id
+            for parent_id, entries in bind_data.content.items()
+            if any(d["steam_id"] == data["steam_id"] for d in entries)
+        }
+        for entries in bind_data.content.values()
+        for data in entries
+    }
+    assert set(bind_data.get_all_steam_id()) == set(expected)
+    for steam_id, parents in expected.items():
+        assert set(bind_data.get_parents(steam_id)) == parents
+
+    for (parent_id, user_id), data in bind_data._by_user.items():
+        assert any(d is data for d in bind_data.content.get(parent_id, []))
+    for steam_id, parents in bind_data._by_steam_id.items():
+        for parent_id, data in parents.items():
+            assert any(d is data for d in bind_data.content.get(parent_id, []))
+
+
+@pytest.fixture
+def bind_data(tmp_path):
+    return BindData(tmp_path / "bind_data.json")
+
+
+def test_add_and_remove(bind_data):
+    bind_data.add("g", entry("u1", "S"))
+    bind_data.add("g", entry("u2", "S"))
+    bind_data.add("h", entry("u1", "T"))
+    assert_consistent(bind_data)
+    assert bind_data.get_by_steam_id("g", "S")["user_id"] == "u1"
+
+    bind_data.remove("g", "u1")
+    assert_consistent(bind_data)
+    assert bind_data.get("g", "u1") is None
+    assert bind_data.get_by_steam_id("g", "S")["user_id"] == "u2"
+
+    bind_data.remove("g", "u2")
+    assert_consistent(bind_data)
+    assert bind_data.get_parents("S") == []
+    assert bind_data.get_all_steam_id() == ["T"]
+
+
+def test_update_replaces_shared_steam_id(bind_data):
+    bind_data.add("g", entry("u1", "S", "old1"))
+    bind_data.add("g", entry("u2", "S", "old2"))
+    bind_data.update("g", [entry("u3", "S", "new")])
+    assert_consistent(bind_data)
+    assert bind_data.get_by_steam_id("g", "S")["nickname"] == "new"
+    assert bind_data.get("g", "u1") is None
+    assert bind_data.get("g", "u2") is None
+
+
+def test_update_to_empty(bind_data):
+    bind_data.add("g", entry("u1", "S"))
+    bind_data.add("h", entry("u1", "S"))
+    bind_data.update("g", [])
+    assert_consistent(bind_data)
+    assert bind_data.get_parents("S") == ["h"]
+
+
+def test_set_steam_id(bind_data):
+    bind_data.add("g", entry("u1", "S"))
+    bind_data.add("g", entry("u2", "T"))
+    bind_data.add("g", entry("u3", "S"))
+
+    bind_data.set_steam_id("g", "u1", "T")
+    assert_consistent(bind_data)
+    # u1 在列表中位于 u2 之前
+    assert bind_data.get_by_steam_id("g", "T")["user_id"] == "u1"
+    assert bind_data.get_by_steam_id("g", "S")["user_id"] == "u3"
+
+    bind_data.set_steam_id("g", "u3", "U")
+    assert_consistent(bind_data)
+    assert bind_data.get_parents("S") == []
+
+
+@pytest.mark.parametrize("use_sqlite", [False, True])
+def test_reload(tmp_path, use_sqlite):
+    store = SqliteStore(tmp_path / "steam_info.db") if use_sqlite else None
+    bind_data = BindData(tmp_path / "bind_data.json", store)
+    bind_data.add("g", entry("u1", "S"))
+    bind_data.add("g", entry("u2", "S"))
+    bind_data.update("h", [entry("u3", "T")])
+    bind_data.save()
+    # 等待后台写入
+    if store is not None:
+        store.run(int)
+    else:
+        submit_write(int).result()
+
+    reloaded = BindData(tmp_path / "bind_data.json", store)
+    assert reloaded.content == bind_data.content
+    assert_consistent(reloaded)
@@ -0,0 +1,25 @@
+import asyncio
+
+import httpcore
+
+from nonebot_plugin_steam_info import client
+
+
+def test_proxy_only_applies_to_steam_hosts(monkeypatch):
+    monkeypatch.setattr(client, "_client_options", {})
+    monkeypatch.setattr(client, "_client", None)
+    monkeypatch.setattr(client, "_closed", False)
+    client.configure_client(proxy="http://127.0.0.1:7890")
+
+    async def main():
+        await client.init_client()
+        try:
+            transports = dict(client._transports)
+        finally:
+            await client.close_client()
+        return transports
+
+    transports = asyncio.run(main())
+    for name in client.POOL_HOSTS:
+        assert isinstance(transports[name]._pool, httpcore.AsyncHTTPProxy)
+    assert not isinstance(transports["default"]._pool, httpcore.AsyncHTTPProxy)
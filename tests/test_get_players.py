@@ -0,0 +1,73 @@
+import asyncio
+
+import httpx
+
+from nonebot_plugin_steam_info import client
+from nonebot_plugin_steam_info.ratelimit import ApiKeyPool
+from nonebot_plugin_steam_info.steam import get_steam_users_info
+
+STEAM_IDS = [str(76561197960265728 + i) for i in range(150)]
+
+
+def run_with_handler(handler, keys):
+    async def main():
+        old_client = client._client
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            # 失败的 Key 只短暂退避，让其他批仍可使用
+            pool = ApiKeyPool(keys, max_backoff=0.01)
+            return await get_steam_users_info(STEAM_IDS, pool), pool
+        finally:
+            await client._client.aclose()
+            client._client = old_client
+
+    return asyncio.run(main())
+
+
+def players_response(request: httpx.Request) -> httpx.Response:
+    steam_ids = request.url.params["steamids"].split(",")
+    return httpx.Response(
+        200, json={"response": {"players": [{"steamid": i} for i in steam_ids]}}
+    )
+
+
+def test_invalid_body_tries_next_key():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.params["key"] == "bad":
+            return httpx.Response(200, text="<html>Error</html>")
+        return players_response(request)
+
+    result, pool = run_with_handler(handler, ["bad", "good"])
+    assert len(result["response"]["players"]) == len(STEAM_IDS)
+
+
+def test_invalid_body_only_fails_its_batch():
+    def handler(request: httpx.Request) -> httpx.Response:
+        # 第一批返回 HTML，第二批正常
+        if STEAM_IDS[0] in request.url.params["steamids"]:
+            return httpx.Response(200, text="<html>Error</html>")
+        return players_response(request)
+
+    result, pool = run_with_handler(handler, ["key"])
+    assert [p["steamid"] for p in result["response"]["players"]] == STEAM_IDS[100:]
+    assert pool.stats()[0]["failures"] == 1
+
+
+def test_missing_players_field():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if STEAM_IDS[0] in request.url.params["steamids"]:
+            return httpx.Response(200, json={"response": {}})
+        return players_response(request)
+
+    result, pool = run_with_handler(handler, ["key"])
+    assert len(result["response"]["players"]) == 50
+
+
+def test_unexpected_error_only_fails_its_batch():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if STEAM_IDS[0] in request.url.params["steamids"]:
+            raise RuntimeError("boom")
+        return players_response(request)
+
+    result, pool = run_with_handler(handler, ["key"])
+    assert [p["steamid"] for p in result["response"]["players"]] == STEAM_IDS[100:]
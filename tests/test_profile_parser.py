@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from nonebot_plugin_steam_info.profile_parser import ProfileParser, parse_profile
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PROFILES = ["profile_public", "profile_private", "profile_no_recent_games"]
+
+
+def load(name: str):
+    html = (FIXTURES / f"{name}.html").read_text("utf-8")
+    expected = json.loads((FIXTURES / f"{name}.json").read_text("utf-8"))
+    # JSON 中没有元组
+    for game in expected["recent_games"]:
+        game["achievements"] = [
+            tuple(achievement) for achievement in game["achievements"]
+        ]
+    return html, expected
+
+
+@pytest.mark.parametrize("name", PROFILES)
+def test_parse_profile(name):
+    html, expected = load(name)
+    assert parse_profile(html) == expected
+
+
+@pytest.mark.parametrize("name", PROFILES)
+@pytest.mark.parametrize("chunk_size", [1, 7, 512])
+def test_parse_profile_in_chunks(name, chunk_size):
+    """与按块下载时的解析方式一致，块边界可能落在标签或实体中间"""
+    html, expected = load(name)
+
+    parser = ProfileParser()
+    for i in range(0, len(html), chunk_size):
+        parser.feed(html[i : i + chunk_size])
+        if parser.done:
+            break
+    parser.close()
+
+    assert parser.profile == expected
+
+
+def test_parser_stops_after_recent_games():
+    html, _ = load("profile_public")
+
+    parser = ProfileParser()
+    parser.feed(html)
+
+    assert parser.done
+    # 最近游戏之后评论区中的 profile_summary 不会覆盖简介
+    assert "不会被读取" not in parser.profile["description"]
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from nonebot_plugin_steam_info import draw
+
+GOLDEN_DIR = Path(__file__).parent / "fixtures" / "recolor"
+SIZES = [(960, 1080), (960, 720), (961, 1003)]
+
+# 缩小后模糊与原尺寸模糊的差异，缩小倍数为 4 时实测最大为 3，平均最大约为 0.16
+MAX_DIFF = 3
+MEAN_DIFF = 0.17
+
+
+def make_backgrounds():
+    """生成固定的测试背景，参考图由原尺寸模糊的 recolor_image 生成"""
+    rng = np.random.default_rng(0)
+    backgrounds = []
+    for width, height in SIZES:
+        pixels = (rng.random((height // 20 + 1, width // 20 + 1, 3)) * 255).astype(
+            np.uint8
+        )
+        backgrounds.append(
+            Image.fromarray(pixels).resize((width, height), Image.BICUBIC)
+        )
+    return backgrounds
+
+
+def diff(image: Image.Image, size) -> np.ndarray:
+    golden = Image.open(GOLDEN_DIR / f"{size[0]}x{size[1]}.png").convert("RGB")
+    return np.abs(np.asarray(image, dtype=int) - np.asarray(golden, dtype=int))
+
+
+@pytest.mark.parametrize("index", range(len(SIZES)))
+def test_recolor_image_full_size(monkeypatch, index):
+    monkeypatch.setattr(draw, "background_reduce_factor", 1)
+    background = make_backgrounds()[index]
+
+    result = diff(draw.recolor_image(background, 10, 10), SIZES[index])
+
+    assert result.max() <= 1
+
+
+@pytest.mark.parametrize("index", range(len(SIZES)))
+def test_recolor_image_reduced(monkeypatch, index):
+    monkeypatch.setattr(draw, "background_reduce_factor", 4)
+    background = make_backgrounds()[index]
+
+    result = diff(draw.recolor_image(background, 10, 10), SIZES[index])
+
+    assert result.max() <= MAX_DIFF
+    assert result.mean() <= MEAN_DIFF
@@ -0,0 +1,162 @@
+import json
+
+import pytest
+
+from nonebot_plugin_steam_info.storage import SqliteStore
+from nonebot_plugin_steam_info.data_source import (
+    BindData,
+    ParentData,
+    SteamInfoData,
+    DisableParentData,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SqliteStore(tmp_path / "steam_info.db")
+    yield store
+    store.close()
+
+
+def rows(store: SqliteStore, name: str):
+    """读取表中的全部行，同时等待之前提交的写入完成"""
+    return dict(
+        store.run(
+            lambda: store._conn.execute(f"SELECT key, value FROM {name}").fetchall()
+        )
+    )
+
+
+def test_table_never_saved_loads_none(store):
+    assert store.table("t").load() is None
+
+
+def test_table_round_trip(store):
+    table = store.table("t")
+    table.save({"a": {"x": 1}, "b": [1, 2], "c": "中文"})
+
+    assert store.table("t").load() == {"a": {"x": 1}, "b": [1, 2], "c": "中文"}
+
+
+def test_table_empty_save_is_remembered(store):
+    store.table("t").save({})
+    assert store.table("t").load() == {}
+
+
+def test_table_writes_only_changed_rows(store, monkeypatch):
+    table = store.table("t")
+    table.save({"a": 1, "b": {"x": 1}, "c": 3})
+
+    writes = []
+    original_write = table._write
+
+    def write(upserts, deletes):
+        writes.append((upserts, deletes))
+        original_write(upserts, deletes)
+
+    monkeypatch.setattr(table, "_write", write)
+
+    table.save({"a": 1, "b": {"x": 2}, "d": 4})
+    assert rows(store, "t") == {"a": "1", "b": '{"x": 2}', "d": "4"}
+    assert writes == [([("b", '{"x": 2}'), ("d", "4")], ["c"])]
+
+    # 没有变化时不写入
+    table.save({"a": 1, "b": {"x": 2}, "d": 4})
+    rows(store, "t")
+    assert len(writes) == 1
+
+
+def test_table_detects_in_place_changes(store):
+    """调用方原地修改同一个对象后再次保存，也应写入"""
+    table = store.table("t")
+    items = {"a": {"x": 1}}
+    table.save(items)
+    items["a"]["x"] = 2
+    table.save(items)
+
+    assert store.table("t").load() == {"a": {"x": 2}}
+
+
+def test_table_delete_all(store):
+    table = store.table("t")
+    table.save({"a": 1, "b": 2})
+    table.save({})
+
+    assert rows(store, "t") == {}
+    assert store.table("t").load() == {}
+
+
+def write_json(path, content):
+    path.write_text(json.dumps(content, indent=4), "utf-8")
+
+
+def test_migrate_bind_data(tmp_path, store):
+    content = {
+        "g1": [
+            {"user_id": "u1", "steam_id": "S1", "nickname": "一"},
+            {"user_id": "u2", "steam_id": "S2", "nickname": None},
+        ],
+        "g2": [{"user_id": "u1", "steam_id": "S1", "nickname": None}],
+    }
+    write_json(tmp_path / "bind_data.json", content)
+
+    migrated = BindData(tmp_path / "bind_data.json", store)
+    assert migrated.content == content
+
+    # 迁移后从数据库读取，不再依赖 JSON
+    (tmp_path / "bind_data.json").unlink()
+    reloaded = BindData(tmp_path / "bind_data.json", store)
+    assert reloaded.content == content
+    assert reloaded.get_parents("S1") == ["g1", "g2"]
+    assert not (tmp_path / "bind_data.json").exists()
+
+
+def test_migrate_steam_info_data(tmp_path, store):
+    content = [
+        {"steamid": "S1", "personastate": 1, "game_start_time": None},
+        {"steamid": "S2", "personastate": 0, "gameextrainfo": "Game"},
+    ]
+    write_json(tmp_path / "steam_info.json", content)
+
+    migrated = SteamInfoData(tmp_path / "steam_info.json", store)
+    assert migrated.content == content
+
+    (tmp_path / "steam_info.json").unlink()
+    reloaded = SteamInfoData(tmp_path / "steam_info.json", store)
+    assert reloaded.content == content
+    assert reloaded.get_player("S2")["gameextrainfo"] == "Game"
+
+
+def test_migrate_parent_and_disable_parent_data(tmp_path, store):
+    write_json(tmp_path / "parent_data.json", {"g1": "群一", "g2": "群二"})
+    write_json(tmp_path / "disable_parent_data.json", ["g2"])
+
+    ParentData(tmp_path / "parent_data.json", store)
+    DisableParentData(tmp_path / "disable_parent_data.json", store)
+    (tmp_path / "parent_data.json").unlink()
+    (tmp_path / "disable_parent_data.json").unlink()
+
+    parent_data = ParentData(tmp_path / "parent_data.json", store)
+    disable_parent_data = DisableParentData(
+        tmp_path / "disable_parent_data.json", store
+    )
+    assert parent_data.content == {"g1": "群一", "g2": "群二"}
+    assert disable_parent_data.content == ["g2"]
+
+
+def test_steam_info_data_round_trip(tmp_path, store):
+    steam_info_data = SteamInfoData(tmp_path / "steam_info.json", store)
+    steam_info_data.update({"steamid": "S1", "personastate": 1})
+    steam_info_data.update({"steamid": "S2", "personastate": 0})
+    steam_info_data.save()
+
+    steam_info_data.update({"steamid": "S1", "personastate": 3})
+    steam_info_data.retain(["S1"])
+    steam_info_data.save()
+
+    assert json.loads(rows(store, "steam_info")["S1"]) == {
+        "steamid": "S1",
+        "personastate": 3,
+    }
+    reloaded = SteamInfoData(tmp_path / "steam_info.json", store)
+    assert reloaded.content == [{"steamid": "S1", "personastate": 3}]